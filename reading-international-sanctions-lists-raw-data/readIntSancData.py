@@ -1,6 +1,13 @@
 import inoutlists
 import pandas as pd
+import numpy as np
+import requests
+import hashlib
+import json
+import time
+from importlib.metadata import version
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import os
 
 #####################################
@@ -18,7 +25,8 @@ dataInfo = {
         },
         "output": {
             "json": Path(pyScriptPath, "ofac_sdn.json"),
-            "csv": Path(pyScriptPath, "ofac_sdn.csv")
+            "csv": Path(pyScriptPath, "ofac_sdn.csv"),
+            "parsed": Path(pyScriptPath, "ofac_sdn.pkl")
         }
     },
     "OFAC-NON-SDN": {
@@ -29,7 +37,8 @@ dataInfo = {
         },
         "output": {
             "json": Path(pyScriptPath, "ofac_consolidated.json"),
-            "csv": Path(pyScriptPath, "ofac_consolidated.csv")
+            "csv": Path(pyScriptPath, "ofac_consolidated.csv"),
+            "parsed": Path(pyScriptPath, "ofac_consolidated.pkl")
         }
     },
     "EU": {
@@ -40,7 +49,8 @@ dataInfo = {
         },
         "output": {
             "json": Path(pyScriptPath, "eu.json"),
-            "csv": Path(pyScriptPath, "eu.csv")
+            "csv": Path(pyScriptPath, "eu.csv"),
+            "parsed": Path(pyScriptPath, "eu.pkl")
         }
     },
     "UN": {
@@ -51,99 +61,199 @@ dataInfo = {
         },
         "output": {
             "json": Path(pyScriptPath, "un.json"),
-            "csv": Path(pyScriptPath, "un.csv")
+            "csv": Path(pyScriptPath, "un.csv"),
+            "parsed": Path(pyScriptPath, "un.pkl")
         }
     }
 }
 
+downloadTimeout = 120 # seconds
+downloadRetries = 3
+downloadBackoff = 5 # seconds, doubled after each failed attempt
+
+# Facts: sheet -> dimension columns. Each fact counts the distinct list entries
+# (id, source) by source, type and the dimension values
+
+factsDimensions = {
+    "IDS": [],
+    "NATIONALITIES": ["nationalities_country_desc"],
+    "ADDRESSES": ["addresses_country_desc"],
+    "PROGRAMS": ["programs"]
+}
+
 #####################################
-#             Process               #
+#             Functions             #
 #####################################
 
-data = {}
-dfLst = []
+def downloadSource(url, localPath):
+
+    # Downloads url into localPath, revalidating the previous download with
+    # its ETag / Last-Modified (kept in a side ".headers.json" file).
+    # Server errors (5xx) and network errors are retried, client errors are
+    # not. Returns True if the content changed since the previous download
+
+    headersPath = Path(f"{localPath}.headers.json")
+    previous = {}
+    if localPath.exists() and headersPath.exists():
+        with open(headersPath, mode="r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    requestHeaders = {}
+    if previous.get("etag"):
+        requestHeaders["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        requestHeaders["If-Modified-Since"] = previous["last_modified"]
+
+    for attempt in range(downloadRetries):
+        try:
+            r = requests.get(url, headers=requestHeaders, timeout=downloadTimeout)
+            if r.status_code == 304:
+                return False
+            r.raise_for_status()
+            break
+        except requests.RequestException as err:
+            if err.response is not None and err.response.status_code < 500:
+                raise
+            print(f"{url}: {err=} (attempt {attempt + 1} of {downloadRetries})")
+            if attempt + 1 == downloadRetries:
+                raise
+            time.sleep(downloadBackoff * 2 ** attempt)
+
+    sha256 = hashlib.sha256(r.content).hexdigest()
+
+    # Validators removed while the file is replaced and both written aside
+    # and moved: a crash never leaves validators of another content
+
+    headersPath.unlink(missing_ok=True)
+
+    tmpPath = Path(f"{localPath}.tmp")
+    with open(tmpPath, mode="wb") as f:
+        f.write(r.content)
+    os.replace(tmpPath, localPath)
+
+    tmpHeadersPath = Path(f"{headersPath}.tmp")
+    with open(tmpHeadersPath, mode="w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "url": url,
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "sha256": sha256
+            },
+            f
+        )
+    os.replace(tmpHeadersPath, headersPath)
+
+    # Servers without validators: same content means not changed
+    return sha256 != previous.get("sha256")
+
+def getFacts(df, dimensions):
+
+    # Distinct entry counts of all the facts. List entries are factorized
+    # once, each fact adds its dimensions codes to the entry codes and keeps
+    # the first row of each code (a hashed distinct set, as drop_duplicates
+    # with keep="first"). Only those rows are grouped
+
+    entryCodes, _ = pd.factorize(
+        pd.MultiIndex.from_arrays([df["id"], df["source"]])
+    )
+
+    facts = {}
+
+    for factName, dimensionCols in dimensions.items():
+
+        factCodes = entryCodes
+        for col in dimensionCols:
+            colCodes, colValues = pd.factorize(df[col], use_na_sentinel=False)
+            factCodes, _ = pd.factorize(
+                factCodes.astype(np.int64) * len(colValues) + colCodes
+            )
+
+        firstRows = np.flatnonzero(~pd.Series(factCodes).duplicated().to_numpy())
 
-for source, sourceInfo in dataInfo.items():        
-    data[source] = inoutlists.load(
-        sourceInfo["input"]["url"], 
+        facts[factName] = df.iloc[firstRows][["source", "type"] + dimensionCols].groupby(
+            ["source", "type"] + dimensionCols,
+            as_index = False,
+            dropna = False
+        ).agg(
+            num_list_entries = ("source", "count")
+        )
+
+    return facts
+
+def parsedPath(sourceInfo):
+
+    # Parse cache of the source for the installed parser version (inoutlists
+    # output may change). Looked up here, not at import time
+
+    parsed = sourceInfo["output"]["parsed"]
+    parserVersion = version("inoutlists")
+    return parsed.with_name(f"{parsed.stem}-inoutlists-{parserVersion}{parsed.suffix}")
+
+def loadSource(source, sourceInfo):
+    data = inoutlists.load(
+        str(sourceInfo["input"]["localPath"]), 
         sourceInfo["input"]["loader"], 
         f"{source}"
     )
-    dfSource = inoutlists.dump(data[source], dumper=inoutlists.DumperPandas)
+    dfSource = inoutlists.dump(data, dumper=inoutlists.DumperPandas)
     dfSource["source"] = source
-    dfLst.append(dfSource)
-
-df = pd.concat(dfLst)
-
-dfId = df.drop_duplicates(["id", "source"])
-dfIdFacts = dfId.groupby(
-    [
-        "source",
-        "type"
-    ],
-    as_index = False,
-    dropna = False
-).agg(
-   num_list_entries = ("source", "count")   
-)
-
-dfNationalities = df.drop_duplicates(["id", "source", "nationalities_country_desc"])
-dfNationalitiesFacts = dfNationalities.groupby(
-    [
-        "source",
-        "type",
-        "nationalities_country_desc"
-    ],
-    as_index = False,
-    dropna = False
-).agg(
-   num_list_entries = ("source", "count")   
-)
-
-dfAddresses = df.drop_duplicates(["id", "source", "addresses_country_desc"])
-dfAddressesFacts = dfAddresses.groupby(
-    [
-        "source",
-        "type",
-        "addresses_country_desc"
-    ],
-    as_index = False,
-    dropna = False
-).agg(
-   num_list_entries = ("source", "count")   
-)
-
-dfPrograms = df.drop_duplicates(["id", "source", "programs"])
-dfProgramsFacts = dfPrograms.groupby(
-    [
-        "source",
-        "type",
-        "programs"
-    ],
-    as_index = False,
-    dropna = False
-).agg(
-   num_list_entries = ("source", "count")   
-)
-
-with pd.ExcelWriter(Path(pyScriptPath, "intSancFacts.xlsx")) as writerExcel:
-    dfIdFacts.to_excel(
-        excel_writer = writerExcel, 
-        sheet_name = "IDS", 
-        index = False
-    )
-    dfNationalitiesFacts.to_excel(
-        excel_writer = writerExcel, 
-        sheet_name = "NATIONALITIES", 
-        index = False
-    )
-    dfAddressesFacts.to_excel(
-        excel_writer = writerExcel, 
-        sheet_name = "ADDRESSES", 
-        index=False
-    )
-    dfProgramsFacts.to_excel(
-        excel_writer = writerExcel, 
-        sheet_name = "PROGRAMS", 
-        index = False
-    )
\ No newline at end of file
+    dfSource.to_pickle(parsedPath(sourceInfo))
+    return dfSource
+
+#####################################
+#             Process               #
+#####################################
+
+if __name__ == "__main__":
+
+    # Concurrent (conditional) downloads into localPath
+
+    with ThreadPoolExecutor(max_workers=len(dataInfo)) as executor:
+        changed = dict(
+            zip(
+                dataInfo.keys(),
+                executor.map(
+                    downloadSource,
+                    [sourceInfo["input"]["url"] for sourceInfo in dataInfo.values()],
+                    [sourceInfo["input"]["localPath"] for sourceInfo in dataInfo.values()]
+                )
+            )
+        )
+
+    # Lists not changed are not parsed again (same parser version). The rest
+    # are loaded each in its own process
+
+    dfSources = {
+        source: pd.read_pickle(parsedPath(sourceInfo))
+        for source, sourceInfo in dataInfo.items()
+        if not changed[source] and parsedPath(sourceInfo).exists()
+    }
+    sourcesToLoad = [source for source in dataInfo.keys() if source not in dfSources]
+
+    print(f"Sources parsed: {sourcesToLoad}, not changed: {list(dfSources.keys())}")
+
+    if sourcesToLoad:
+        with ProcessPoolExecutor(max_workers=len(sourcesToLoad)) as executor:
+            dfSources.update(
+                zip(
+                    sourcesToLoad,
+                    executor.map(
+                        loadSource, 
+                        sourcesToLoad, 
+                        [dataInfo[source] for source in sourcesToLoad]
+                    )
+                )
+            )
+
+    df = pd.concat([dfSources[source] for source in dataInfo.keys()])
+
+    facts = getFacts(df, factsDimensions)
+
+    with pd.ExcelWriter(Path(pyScriptPath, "intSancFacts.xlsx")) as writerExcel:
+        for factName, dfFacts in facts.items():
+            dfFacts.to_excel(
+                excel_writer = writerExcel, 
+                sheet_name = factName, 
+                index = False
+            )
@@ -0,0 +1,129 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import readIntSancData
+
+CONTENT = b"<sanctions>entries</sanctions>"
+ETAG = '"v1"'
+
+class ListServer:
+
+    # Local stand-in of a list server: answers the scripted status codes in
+    # order (200 with CONTENT and ETAG, 304 when If-None-Match is ETAG)
+
+    def __init__(self):
+
+        self.statuses = []
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                status = server.statuses.pop(0)
+                if status == 200 and self.headers.get("If-None-Match") == ETAG:
+                    status = 304
+                self.send_response(status)
+                if status == 200:
+                    self.send_header("ETag", ETAG)
+                    self.send_header("Content-Length", str(len(CONTENT)))
+                    self.end_headers()
+                    self.wfile.write(CONTENT)
+                else:
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/list.xml"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server(monkeypatch):
+
+    monkeypatch.setattr(readIntSancData, "downloadBackoff", 0)
+    server = ListServer()
+    yield server
+    server.close()
+
+def test_download_then_not_modified(server, tmp_path):
+
+    localPath = tmp_path / "list.xml"
+
+    server.statuses = [200]
+    assert readIntSancData.downloadSource(server.url, localPath) is True
+    assert localPath.read_bytes() == CONTENT
+    headers = json.loads((tmp_path / "list.xml.headers.json").read_text())
+    assert headers["etag"] == ETAG
+
+    server.statuses = [200]
+    assert readIntSancData.downloadSource(server.url, localPath) is False
+    assert server.requests[-1].get("If-None-Match") == ETAG
+    assert localPath.read_bytes() == CONTENT
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["list.xml", "list.xml.headers.json"]
+
+def test_retry_after_server_error(server, tmp_path):
+
+    localPath = tmp_path / "list.xml"
+
+    server.statuses = [503, 500, 200]
+    assert readIntSancData.downloadSource(server.url, localPath) is True
+    assert len(server.requests) == 3
+    assert localPath.read_bytes() == CONTENT
+
+def test_server_errors_exhaust_retries(server, tmp_path):
+
+    server.statuses = [503] * readIntSancData.downloadRetries
+    with pytest.raises(requests.HTTPError):
+        readIntSancData.downloadSource(server.url, tmp_path / "list.xml")
+    assert len(server.requests) == readIntSancData.downloadRetries
+    assert not (tmp_path / "list.xml").exists()
+
+def test_client_errors_are_not_retried(server, tmp_path):
+
+    server.statuses = [404, 200]
+    with pytest.raises(requests.HTTPError):
+        readIntSancData.downloadSource(server.url, tmp_path / "list.xml")
+    assert len(server.requests) == 1
+
+def test_network_errors_are_retried(server, tmp_path, monkeypatch):
+
+    calls = []
+    get = requests.get
+
+    def flakyGet(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise requests.ConnectionError("connection reset")
+        return get(*args, **kwargs)
+
+    monkeypatch.setattr(readIntSancData.requests, "get", flakyGet)
+
+    server.statuses = [200]
+    assert readIntSancData.downloadSource(server.url, tmp_path / "list.xml") is True
+    assert len(calls) == 2
+
+def test_parse_cache_keyed_by_parser_version(monkeypatch):
+
+    sourceInfo = readIntSancData.dataInfo["EU"]
+
+    monkeypatch.setattr(readIntSancData, "version", lambda name: "1.0.3")
+    cacheOld = readIntSancData.parsedPath(sourceInfo)
+    monkeypatch.setattr(readIntSancData, "version", lambda name: "1.0.4")
+    cacheNew = readIntSancData.parsedPath(sourceInfo)
+
+    assert cacheOld != cacheNew
+    assert cacheNew.name == "eu-inoutlists-1.0.4.pkl"
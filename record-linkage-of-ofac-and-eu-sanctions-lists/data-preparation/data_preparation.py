@@ -17,11 +17,30 @@ if PATH_PROJECT not in sys.path:
 #          Imports            #
 ###############################
 
+import argparse
+import hashlib
 import inoutlists
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import csv
-from support.name_normalization import normalize_name, remove_legal_forms, normalize_name_basic
+from support.name_normalization import (
+    normalize_names_parallel,
+    LEGAL_TERMS,
+    NORMALIZATION_VERSION
+)
+from support.list_streaming import write_lists_parquet, list_entry_hashes
+from support.data_schema import read_data, write_data
+from support.entity_store import assign_entity_keys
+from support.city_canonicalization import (
+    CityCanonicalizer,
+    read_city_mapping,
+    CITY_FUZZY_THRESHOLD
+)
+from support.fingerprints import (
+    row_fingerprint,
+    name_block_fingerprint,
+    dedup_by_fingerprint
+)
 
 ###############################
 #         Parameters          #
@@ -29,6 +48,9 @@ from support.name_normalization import normalize_name, remove_legal_forms, norma
 
 FILE_ADDRESSES_CITY_NORMALIZATION = os.path.join(PATH_SUPPORT, "addresses_city_normalization.csv")
 FILE_RESULTS = os.path.join(PATH_DATA, "data_EU_OFAC.parquet")
+FILE_DATA_RAW = os.path.join(PATH_DATA, "data_EU_OFAC_raw.parquet")
+FILE_TRANSLITERATION_CACHE = os.path.join(PATH_DATA, "transliteration_cache.sqlite")
+FILE_HASHES = os.path.join(PATH_DATA, "data_EU_OFAC_hashes.parquet")
 
 DATA_SETS = {
     "EU": {
@@ -47,135 +69,278 @@ DATA_SETS = {
 #    Classes and functions    #
 ###############################
 
-###############################
-#          Process            #
-###############################
-
-# Data Retrieval
+def loadDataSet(dataSetName, dataSetInfo):
 
-dataRaw = {}
-lsDataRaw = []
-lsDataCleaned = []
-
-for dataSetName, dataSetInfo in DATA_SETS.items():
-    
-    dataRaw[dataSetName] = inoutlists.load(
+    dataRaw = inoutlists.load(
         dataSetInfo["file"],
         dataSetInfo["loader"],
         description=dataSetInfo["description"]
     )
     dfDataSet = inoutlists.dump(
-        dataRaw[dataSetName],
+        dataRaw,
         inoutlists.DumperPandas        
     )
     dfDataSet["source"] = dataSetName
-    lsDataRaw.append(dfDataSet)
-
-dfDataRaw = pd.concat(lsDataRaw, ignore_index=True)
-dfDataRaw["IDX"] = dfDataRaw["id"] + "-" + dfDataRaw.index.astype(str)
-
-dfAddressesCityNormalization = pd.read_csv(
-    FILE_ADDRESSES_CITY_NORMALIZATION,
-    dtype=str,
-    sep=",",
-    keep_default_na=False,
-    quoting=csv.QUOTE_ALL,
-    quotechar='"',
-    encoding='utf-8'
-)
 
-# Data Cleaning and normalization
+    return dfDataSet
 
-dfDataCleaned = dfDataRaw.copy()    
+def getParamsHash(cityFuzzyThreshold=None):
 
-## Adresses country ISO code missing code normalization
+    # Any change in the normalization invalidates previous prepared entries
 
-dfDataCleaned['addresses_country_ISO_code'] = (
-    dfDataCleaned['addresses_country_ISO_code']
-    .replace("00", np.nan)
-)
+    params = hashlib.sha256()
+    with open(FILE_ADDRESSES_CITY_NORMALIZATION, mode="rb") as f:
+        params.update(f.read())
+    params.update(str(NORMALIZATION_VERSION).encode("utf-8"))
+    params.update("|".join(LEGAL_TERMS).encode("utf-8"))
+    if cityFuzzyThreshold is not None:
+        params.update(f"city fuzzy {cityFuzzyThreshold}".encode("utf-8"))
+    return params.hexdigest()
 
-maskEmptyCountryISO = (
-    (dfDataCleaned.addresses_country_ISO_code == "") |
-    (dfDataCleaned.addresses_country_ISO_code.isna())
-)
+def cleanData(dfDataRaw, cityCanonicalizer, workers):
 
-dfDataCleaned.loc[maskEmptyCountryISO, "addresses_country_ISO_code"] = np.nan
+    dfDataCleaned = dfDataRaw.copy()    
 
-## Names normalization: transliteration to latin script + basic normalization
+    ## Adresses country ISO code missing code normalization
 
-dfDataCleaned['names_whole_name_norm'] = dfDataCleaned['names_whole_name'].apply(
-    lambda x: normalize_name(x)
-)
+    dfDataCleaned['addresses_country_ISO_code'] = (
+        dfDataCleaned['addresses_country_ISO_code']
+        .replace("00", np.nan)
+    )
 
-## Remove organizational legal forms 
+    maskEmptyCountryISO = (
+        (dfDataCleaned.addresses_country_ISO_code == "") |
+        (dfDataCleaned.addresses_country_ISO_code.isna())
+    )
 
-dfDataCleaned.loc[dfDataCleaned["type"] == "O", "names_whole_name_norm"] = (
-    dfDataCleaned
-    .loc[dfDataCleaned["type"] == "O", "names_whole_name_norm"]
-    .apply(remove_legal_forms)
-)
+    dfDataCleaned.loc[maskEmptyCountryISO, "addresses_country_ISO_code"] = np.nan
 
-## Name normalization basic
+    ## Names normalization in a single pass: transliteration to latin script + 
+    ## basic normalization, removing organizational legal forms, and name 
+    ## normalization basic
+    ## (transliterations are memoized across runs in FILE_TRANSLITERATION_CACHE)
 
-dfDataCleaned['names_whole_name_norm_basic'] = dfDataCleaned['names_whole_name'].apply(
-    lambda x: normalize_name_basic(x)
-)
+    namesNorm, normalizationCounters = normalize_names_parallel(
+        dfDataCleaned['names_whole_name'],
+        dfDataCleaned['type'] == "O",
+        workers=workers,
+        cachePath=FILE_TRANSLITERATION_CACHE
+    )
 
-## Keep rows with non empty normalized names
+    dfDataCleaned['names_whole_name_norm'] = namesNorm["norm_legal"]
+    dfDataCleaned['names_whole_name_norm_basic'] = namesNorm["norm_basic"]
 
-maskEmptyNamesNorm = (
-    (dfDataCleaned.names_whole_name_norm == "") |
-    (dfDataCleaned.names_whole_name_norm.isna() |
-    (dfDataCleaned.names_whole_name_norm_basic == "") |
-    (dfDataCleaned.names_whole_name_norm_basic.isna())
+    print(f"Normalization counters: {normalizationCounters}")
+
+    ## Keep rows with non empty normalized names
+
+    maskEmptyNamesNorm = (
+        (dfDataCleaned.names_whole_name_norm == "") |
+        (dfDataCleaned.names_whole_name_norm.isna() |
+        (dfDataCleaned.names_whole_name_norm_basic == "") |
+        (dfDataCleaned.names_whole_name_norm_basic.isna())
+        )
     )
-)
 
-dfDataCleaned = dfDataCleaned[~maskEmptyNamesNorm]
+    dfDataCleaned = dfDataCleaned[~maskEmptyNamesNorm].reset_index(drop=True)
 
-## Addresses city normalization
+    ## Addresses city normalization (mapped cities, cities as they are
+    ## otherwise, empty as NaN)
 
-dfDataCleaned = dfDataCleaned.merge(
-    dfAddressesCityNormalization,
-    on=[
-        "addresses_city",
-        "addresses_country_ISO_code"
-    ],
-    how="left"
-)
+    dfDataCleaned["addresses_city_norm"] = cityCanonicalizer.canonicalize(
+        dfDataCleaned["addresses_city"],
+        dfDataCleaned["addresses_country_ISO_code"]
+    )
 
-dfDataCleaned["addresses_city_norm_ds"] = dfDataCleaned["addresses_city"].mask(
-    dfDataCleaned["addresses_city_norm"].notna(),
-    dfDataCleaned["addresses_city_norm"]
-)
+    ## Deduplication after normalization (64-bit fingerprint of the rows)
 
-dfDataCleaned = dfDataCleaned.drop(columns=["addresses_city_norm"])
-dfDataCleaned.rename(
-    columns={
-        "addresses_city_norm_ds": "addresses_city_norm"
-    },
-    inplace=True
-)
+    dfDataCleaned["row_fingerprint"] = row_fingerprint(dfDataCleaned)
+    dfDataCleaned = dedup_by_fingerprint(dfDataCleaned, "row_fingerprint")
 
-maskEmptyCityNorm = (
-    (dfDataCleaned.addresses_city_norm == "") |
-    (dfDataCleaned.addresses_city_norm.isna())
-)
+    dfDataCleaned["name_block_fingerprint"] = name_block_fingerprint(dfDataCleaned)
 
-dfDataCleaned.loc[maskEmptyCityNorm, "addresses_city_norm"] = np.nan
+    return dfDataCleaned
 
-## Deduplication after normalization
+###############################
+#          Process            #
+###############################
 
-dfDataCleaned.drop_duplicates(
-    inplace = True
-)
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="EU and OFAC data preparation")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Worker processes for lists loading (one list per worker) and "
+            "names normalization (1: no multi-processing)"
+        )
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only prepare list entries added or changed since the previous run"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream the XML lists into FILE_DATA_RAW in batches before loading them"
+    )
+    parser.add_argument(
+        "--city-fuzzy",
+        action="store_true",
+        help="Resolve cities not in the normalization mapping to close spellings of mapped ones"
+    )
+    args = parser.parse_args()
+
+    # Data Retrieval
+
+    if args.streaming:
+
+        ## XML entries validated and parsed one by one and written in row
+        ## groups. Only the XML parsing is flat in memory: the raw frame is
+        ## read whole, as the delta hashes, the cleaning and the entity keys
+        ## need all the entries
+
+        write_lists_parquet(DATA_SETS, FILE_DATA_RAW)
+
+        dfDataRaw = pd.read_parquet(
+            FILE_DATA_RAW,
+            engine="fastparquet"
+        )
 
-# Export results
+    else:
 
-dfDataCleaned.to_parquet(
-    FILE_RESULTS, 
-    index=False, 
-    engine="fastparquet",
-    compression="snappy"
-)
\ No newline at end of file
+        ## Each list is loaded in its own process when there are workers
+
+        if args.workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(args.workers, len(DATA_SETS))
+            ) as executor:
+                lsDataRaw = list(
+                    executor.map(
+                        loadDataSet,
+                        DATA_SETS.keys(),
+                        DATA_SETS.values()
+                    )
+                )
+        else:
+            lsDataRaw = [
+                loadDataSet(dataSetName, dataSetInfo)
+                for dataSetName, dataSetInfo in DATA_SETS.items()
+            ]
+
+        dfDataRaw = pd.concat(lsDataRaw, ignore_index=True)
+
+    dfDataRaw["IDX"] = dfDataRaw["id"] + "-" + dfDataRaw.index.astype(str)
+
+    cityFuzzyThreshold = CITY_FUZZY_THRESHOLD if args.city_fuzzy else None
+
+    cityCanonicalizer = CityCanonicalizer(
+        read_city_mapping(FILE_ADDRESSES_CITY_NORMALIZATION),
+        cityFuzzyThreshold
+    )
+
+    # Entries delta against the previous prepared snapshot
+
+    paramsHash = getParamsHash(cityFuzzyThreshold)
+    dfHashes = list_entry_hashes(dfDataRaw)
+    dfHashes["params_hash"] = paramsHash
+
+    deltaMode = (
+        args.delta and
+        os.path.exists(FILE_RESULTS) and
+        os.path.exists(FILE_HASHES)
+    )
+
+    if deltaMode:
+        dfHashesPrev = pd.read_parquet(
+            FILE_HASHES,
+            engine="fastparquet"
+        )
+        if not (dfHashesPrev.params_hash == paramsHash).all():
+            print("Normalization parameters changed: full preparation")
+            deltaMode = False
+    elif args.delta:
+        print("No previous snapshot: full preparation")
+
+    if deltaMode:
+
+        dfDelta = dfHashes[["source", "id", "hash"]].merge(
+            dfHashesPrev[["source", "id", "hash"]],
+            on=["source", "id"],
+            how="outer",
+            suffixes=("", "_prev"),
+            indicator=True
+        )
+
+        dfDelta["status"] = np.select(
+            [
+                dfDelta._merge == "left_only",
+                dfDelta._merge == "right_only",
+                dfDelta.hash != dfDelta.hash_prev
+            ],
+            [
+                "added",
+                "removed",
+                "changed"
+            ],
+            default="unchanged"
+        )
+
+        print(f"Entries delta: {dfDelta.status.value_counts().to_dict()}")
+
+        entriesUnchanged = pd.MultiIndex.from_frame(
+            dfDelta.loc[dfDelta.status == "unchanged", ["source", "id"]]
+        )
+
+        dfDataPrev = read_data(FILE_RESULTS)
+        dfDataPrev = dfDataPrev[
+            pd.MultiIndex.from_frame(dfDataPrev[["source", "id"]])
+            .isin(entriesUnchanged)
+        ]
+
+        dfDataRawDelta = dfDataRaw[
+            ~pd.MultiIndex.from_frame(dfDataRaw[["source", "id"]])
+            .isin(entriesUnchanged)
+        ]
+
+        # Data Cleaning and normalization (added and changed entries)
+
+        lsDataCleaned = [dfDataPrev]
+        if len(dfDataRawDelta) > 0:
+            lsDataCleaned.append(
+                cleanData(dfDataRawDelta, cityCanonicalizer, args.workers)
+            )
+
+        ## Empty frames left out of the concat (all entries unchanged or
+        ## all changed)
+
+        dfDataCleaned = pd.concat(
+            [df for df in lsDataCleaned if len(df) > 0] or [dfDataPrev],
+            ignore_index=True
+        )
+
+    else:
+
+        # Data Cleaning and normalization
+
+        dfDataCleaned = cleanData(dfDataRaw, cityCanonicalizer, args.workers)
+
+    print(f"City canonicalization counters: {cityCanonicalizer.counters}")
+
+    # Integer record and entity keys
+
+    dfDataCleaned = assign_entity_keys(dfDataCleaned)
+
+    # Export results (compact schema: categorical low cardinality columns)
+
+    write_data(dfDataCleaned, FILE_RESULTS)
+
+    dfHashes.to_parquet(
+        FILE_HASHES, 
+        index=False, 
+        engine="fastparquet",
+        compression="snappy"
+    )
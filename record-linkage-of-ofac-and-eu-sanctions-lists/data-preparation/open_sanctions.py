@@ -12,6 +12,7 @@ PATH_DATA = os.path.join(PATH_PROJECT, "data")
 #          Imports            #
 ###############################
 
+import json
 import pandas as pd
 import numpy as np
 
@@ -26,10 +27,97 @@ FILES_OS = {
 
 FILE_RESULTS = os.path.join(PATH_DATA, "open_sanctions.parquet")
 
+# Fields kept from the nested export entities
+
+OS_FIELDS = [
+    "id",
+    "schema",
+    "target",
+    "datasets",
+    "caption",
+    "referents"
+]
+
+# Referents of the list entries by source (first choice), the captured group
+# is the original list id
+
+REFERENTS_PRIMARY = {
+    "EU": r'^eu-fsf-(.+)$',
+    "OFAC": r'^ofac-(\d+)$'
+}
+
+OS_BATCH_SIZE = 50000
+
 ###############################
 #    Classes and functions    #
 ###############################
 
+def iterOSEntities(file):
+
+    # Entities of a nested export (one JSON object per line), only OS_FIELDS
+
+    with open(file, mode="r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entity = json.loads(line)
+                yield {field: entity.get(field) for field in OS_FIELDS}
+
+def iterOSBatches(file, batchSize=OS_BATCH_SIZE):
+
+    batch = []
+
+    for entity in iterOSEntities(file):
+        batch.append(entity)
+        if len(batch) >= batchSize:
+            yield pd.DataFrame(batch, columns=OS_FIELDS)
+            batch = []
+
+    if batch:
+        yield pd.DataFrame(batch, columns=OS_FIELDS)
+
+def resolveReferents(df, source):
+
+    # Preferred referent by entity id (rows: one by referent, in file order)
+    # and its original list id. Primary referents first, then the greatest
+    # referent, no referent last: group-wise argmax of a rank made of the
+    # primary flag and the sorted codes of the referents (first row on ties)
+
+    df = df.reset_index(drop=True)
+
+    idOri = df.referents.str.extract(REFERENTS_PRIMARY[source], expand=False)
+    referentCodes, referentValues = pd.factorize(df.referents, sort=True)
+    referentRank = referentCodes + np.where(idOri.notna(), len(referentValues), 0)
+
+    bestRows = (
+        pd.Series(referentRank)
+        .groupby(df.id.to_numpy(), sort=False)
+        .idxmax()
+        .to_numpy()
+    )
+
+    df = df.loc[bestRows].reset_index(drop=True)
+    df["id_ori"] = idOri.loc[bestRows].to_numpy()
+
+    return df
+
+def readOS(file, source):
+
+    # One row by entity id with its preferred referent, resolved by batches
+    # of lines and then between batches (ids in more than one line)
+
+    lsOSBatch = [
+        resolveReferents(dfBatch.explode("referents"), source)
+        for dfBatch in iterOSBatches(file)
+    ]
+
+    df = resolveReferents(
+        pd.concat(lsOSBatch, ignore_index=True).drop(columns="id_ori"),
+        source
+    )
+    df["source"] = source
+
+    return df
+
 ###############################
 #          Process            #
 ###############################
@@ -37,48 +125,17 @@ FILE_RESULTS = os.path.join(PATH_DATA, "open_sanctions.parquet")
 # Read OpenSanctions data
 
 lsOS= []
-lsOSOri = []
 
 for source, file in FILES_OS.items():   
     
-    df = pd.read_json(file, dtype=True, lines=True)
-    df["source"] = source
-
-    lsOSOri.append(df)
-
-    df = df.explode(["referents"])
-    if source == "EU":        
-        df["referents_first"] = np.where(
-            df.referents.str.match(r'^eu-fsf-(.+)$', na=False),
-            1,
-            0
-        )        
-    elif source == "OFAC":
-        df["referents_first"] = np.where(
-            df.referents.str.match(r'^ofac-\d+$', na=False),
-            1,
-            0
-        )        
-    df.sort_values(
-        by=["id", "referents_first", "referents"],
-        ascending=[False, False, False],
-        inplace=True
-    )
-
-    df = df.drop_duplicates(
-        subset=["id"],
-        keep="first"
-    )
+    df = readOS(file, source)
 
     if source == "EU":
-        df["id_ori"] = df.referents.str.extract(r'^eu-fsf-(.+)$')
         df['id_ori'] = (
             df['id_ori']
             .str.replace('-', '.', regex=False)
             .str.replace('eu.', 'EU.', regex=False)
         )
-    elif source == "OFAC":
-        df["id_ori"] = df.referents.str.extract(r'^ofac-(\d+)$')
 
     df = df[
         [
@@ -95,7 +152,6 @@ for source, file in FILES_OS.items():
     lsOS.append(df)
 
 dfOS = pd.concat(lsOS, ignore_index=True)
-dfOSOri = pd.concat(lsOSOri, ignore_index=True)
 
 # Create ID mapping between EU and OFAC based on OpenSanctions referents
 
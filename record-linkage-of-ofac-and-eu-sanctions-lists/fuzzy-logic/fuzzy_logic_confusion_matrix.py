@@ -17,10 +17,15 @@ if PATH_PROJECT not in sys.path:
 #          Imports            #
 ###############################
 
+import argparse
 import pandas as pd
 import numpy as np
-import recordlinkage
 from support.utils import timer, confusion_matrix
+from support.data_schema import read_data
+from support.entity_store import EntityStore
+from support.ground_truth import GroundTruth
+from support.fingerprints import FINGERPRINT_BLOCK_COLUMNS, dedup_by_fingerprint
+from support.string_comparison import NameComparator, compare_blocks
 
 ###############################
 #         Parameters          #
@@ -42,9 +47,10 @@ BLOKED_TYPES_COLUMNS = {
 }
 
 RELEVANT_COLS = [
+    "record_id",
+    "entity_id",
     "source",
     "id",
-    "IDX",
     "type",
     "names_whole_name",
     "names_whole_name_norm",
@@ -75,278 +81,233 @@ processMeasures = []
 #          Process            #
 ###############################
 
-# Data Retrieval
+if __name__ == "__main__":
 
-with timer("Data retrieval", processMeasures):
-
-    dfOS = pd.read_parquet(
-        FILE_OS,
-        engine = "fastparquet"
+    parser = argparse.ArgumentParser(description="Fuzzy logic record linkage confusion matrix")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for the blocks scoring (1: no multi-processing)"
     )
+    args = parser.parse_args()
 
-    dfData = pd.read_parquet(
-        FILE_DATA,
-        engine= "fastparquet"
-    )
+    # Data Retrieval
 
-    dfDataIds = dfData.copy()
+    with timer("Data retrieval", processMeasures):
 
-    dfDataIds.sort_values(
-        by = ["source", "id", "IDX"],
-        inplace = True
-    )
+        groundTruth = GroundTruth.load(FILE_OS)
 
-    dfDataIds.drop_duplicates(
-        subset = ["source", "id"],
-        keep="first",
-        inplace = True
-    )
+        dfData = read_data(
+            FILE_DATA,
+            columns = RELEVANT_COLS + ["names_strong", "name_block_fingerprint"]
+        )
 
-# Data preparation
+        entityStore = EntityStore(dfData)
 
-with timer("Data preparation", processMeasures):
+        dfDataIds = entityStore.entities
 
-    lsDataRL = []    
+    # Data preparation
 
-    for entitityType, columnsBlock in BLOKED_TYPES_COLUMNS.items():
+    with timer("Data preparation", processMeasures):
 
-        dfDataRLType = dfData[
-            (dfData.type == entitityType) &
-            (dfData.names_strong)
-        ].copy()
+        lsDataRL = []    
 
-        dfDataRLType.sort_values(
-            by=[
-                "source", 
-                "id", 
-                "names_whole_name_norm"
-            ] + columnsBlock,
-            inplace=True
-        )
+        for entitityType, columnsBlock in BLOKED_TYPES_COLUMNS.items():
 
-        dfDataRLType.drop_duplicates(
-            subset=[
-                "source", 
-                "id", 
-                "names_whole_name_norm"
-            ] + columnsBlock,
-            keep="first",
-            inplace=True
-        )
-        dfDataRLType = dfDataRLType[RELEVANT_COLS]
+            dfDataRLType = dfData[
+                (dfData.type == entitityType) &
+                (dfData.names_strong)
+            ].copy()
 
-        lsDataRL.append(dfDataRLType)
+            ## Dedup by the name block fingerprint of the data preparation when
+            ## the blocking columns are the same, otherwise by the columns
 
-    dfDataRL = pd.concat(lsDataRL)
+            if columnsBlock == FINGERPRINT_BLOCK_COLUMNS.get(entitityType):
 
-    dfDataRLIds = dfDataRL.copy()
+                dfDataRLType = dedup_by_fingerprint(
+                    dfDataRLType,
+                    "name_block_fingerprint"
+                )
 
-    dfDataRLIds.sort_values(
-        by = ["source", "id", "IDX"],
-        inplace = True
-    )
+            else:
 
-    dfDataRLIds.drop_duplicates(
-        subset = ["source", "id"],
-        keep="first",
-        inplace = True
-    )
+                dfDataRLType.sort_values(
+                    by=[
+                        "source", 
+                        "id", 
+                        "names_whole_name_norm"
+                    ] + columnsBlock,
+                    inplace=True
+                )
 
-# Record Linkage
+                dfDataRLType.drop_duplicates(
+                    subset=[
+                        "source", 
+                        "id", 
+                        "names_whole_name_norm"
+                    ] + columnsBlock,
+                    keep="first",
+                    inplace=True
+                )
 
-with timer("Record linkange", processMeasures):
+            dfDataRLType = dfDataRLType[RELEVANT_COLS]
 
-    lsCompare = []
+            lsDataRL.append(dfDataRLType)
 
-    for entityType, columnsBlock in BLOKED_TYPES_COLUMNS.items():
-        
-        dfDataCompareType = dfDataRL[dfDataRL.type == entityType].copy()
-        dfDataCompareType.set_index("IDX", inplace=True)
-        
-        indexer = recordlinkage.Index()
-        indexer.add(
-            [
-                recordlinkage.index.Block(
-                    left_on=columnsBlock,
-                    right_on=columnsBlock
-                )
-            ]
-        )
+        dfDataRL = pd.concat(lsDataRL)
 
-        candidateLinksType = indexer.index(
-            dfDataCompareType[dfDataCompareType.source == "EU"],
-            dfDataCompareType[dfDataCompareType.source == "OFAC"]
-        )    
+        dfDataRLIds = dfDataRL.copy()
 
-        compare = recordlinkage.Compare()
-        compare.string(
-            'names_whole_name_norm', 
-            'names_whole_name_norm', 
-            method='jarowinkler'
+        dfDataRLIds.sort_values(
+            by = ["source", "id", "record_id"],
+            inplace = True
         )
-        compare.string(
-            'names_whole_name_norm', 
-            'names_whole_name_norm', 
-            method='cosine'
-        )
-        dfCompareType = compare.compute(
-            candidateLinksType, 
-            dfDataCompareType[dfDataCompareType.source == "EU"], 
-            dfDataCompareType[dfDataCompareType.source == "OFAC"]
+
+        dfDataRLIds.drop_duplicates(
+            subset = ["source", "id"],
+            keep="first",
+            inplace = True
         )
 
-        dfCompareType.reset_index(inplace=True)
-        dfCompareType.rename(
+    # Record Linkage
+
+    with timer("Record linkange", processMeasures):
+
+        lsCompare = []
+
+        for entityType, columnsBlock in BLOKED_TYPES_COLUMNS.items():
+        
+            dfDataCompareType = dfDataRL[dfDataRL.type == entityType].copy()
+            dfDataCompareType.set_index("record_id", inplace=True)
+        
+            ## Candidate pairs block by block, scored by chunks and reduced to
+            ## the best pair of each pair of entities. Each unique (EU name,
+            ## OFAC name) pair is scored once. With workers, the blocks are
+            ## shared by processes balanced by pairs (|EU| x |OFAC| rows)
+
+            ## Jaro-Winkler is not computed for the pairs that cannot reach the
+            ## lowest threshold (their distance_max only needs to be under it)
+
+            comparator = NameComparator(
+                dfDataCompareType.names_whole_name_norm,
+                minScore = min(thresholds)
+            )
+
+            dfCompareType = compare_blocks(
+                dfDataCompareType[dfDataCompareType.source == "EU"],
+                dfDataCompareType[dfDataCompareType.source == "OFAC"],
+                columnsBlock,
+                "names_whole_name_norm",
+                comparator,
+                reduceOn = "entity_id",
+                workers = args.workers
+            )
+
+            print(f"Name pairs ({entityType}): {comparator.stats()}")
+
+            lsCompare.append(dfCompareType)
+
+        dfCompare = pd.concat(lsCompare, ignore_index=True)
+
+        dfCompare.rename(
             columns = {
-                0: "distance_jw",
-                1: "distance_cosine"
+                "record_id_1": "record_id_EU",
+                "record_id_2": "record_id_OFAC",
+                "entity_id_1": "entity_EU",
+                "entity_id_2": "entity_OFAC"
             },
-            inplace=True
-        )    
-        dfCompareType["distance_max"] = (
-            dfCompareType[["distance_jw", "distance_cosine"]].max(axis=1)
+            inplace = True
         )
-        lsCompare.append(dfCompareType)      
-    
-    dfCompare = pd.concat(lsCompare, ignore_index=True)
-
-with timer("Original IDs extraction", processMeasures):
-
-    dfCompare["id_EU"] = dfCompare["IDX_1"].str.split("-", expand = True)[0]
-    dfCompare["id_OFAC"] = dfCompare["IDX_2"].str.split("-", expand = True)[0]
-    dfCompare.rename(
-        columns = {
-            "IDX_1": "IDX_EU",
-            "IDX_2": "IDX_OFAC"
-        },
-        inplace = True
-    )
 
-# Real match retrieval
+    # Real match retrieval
 
-with timer("Real match retrieval", processMeasures):
+    with timer("Real match retrieval", processMeasures):
 
-    ## Remove OS eu and ofac ids not in dataset
+        ## OS matches whose eu and ofac ids are both in dataset
 
-    dfOSInData = dfOS.copy()
+        groundTruth = groundTruth.restrict(
+            dfDataIds[dfDataIds.source == "EU"].id,
+            dfDataIds[dfDataIds.source == "OFAC"].id
+        )
 
-    maskOsInDataEU = (
-        (~dfOSInData.id_ori_eu.isin(dfData[dfData.source == "EU"].id.unique())) &
-        (dfOSInData.source.isin(["EU", "EU & OFAC"]))
-    )
-    dfOSInData = dfOSInData[~maskOsInDataEU].copy()
+        ## Retrieve real matches
 
-    maskOsInDataOFAC = (
-        (~dfOSInData.id_ori_ofac.isin(dfData[dfData.source == "OFAC"].id.unique())) &
-        (dfOSInData.source.isin(["OFAC", "EU & OFAC"]))
-    )
-    dfOSInData = dfOSInData[~maskOsInDataOFAC].copy()
-
-    dfOSInData.rename(
-        columns={
-            "id_ori_eu": "id_EU",
-            "id_ori_ofac": "id_OFAC"
-        },
-        inplace=True
-    )    
-
-    ## Retrieve real matches
-
-    dfAssestment = dfCompare.copy()
-
-    dfAssestment.sort_values(
-        by = [
-            "id_EU",
-            "id_OFAC",        
-            "distance_max"
-        ],
-        ascending = [True, True, False],
-        inplace = True
-    )
+        dfAssestment = dfCompare.copy()
 
-    dfAssestment.drop_duplicates(
-        subset=["id_EU", "id_OFAC"],
-        keep="first",
-        inplace=True
-    )
+        dfAssestment.sort_values(
+            by = [
+                "entity_EU",
+                "entity_OFAC",        
+                "distance_max"
+            ],
+            ascending = [True, True, False],
+            inplace = True
+        )
 
-    dfAssestment = dfAssestment.merge(
-        dfOSInData[dfOSInData.source == "EU & OFAC"][
-            [         
-                "id_EU",           
-                "id_OFAC",
-            ]
-        ],
-        on = ["id_EU", "id_OFAC"],
-        how ="outer",
-        indicator = True
-    )
+        dfAssestment.drop_duplicates(
+            subset=["entity_EU", "entity_OFAC"],
+            keep="first",
+            inplace=True
+        )
 
-    dfAssestment["real"] = np.where(
-        dfAssestment._merge.isin(["both", "right_only"]),
-        True,
-        False
-    )
+        idsEU = entityStore.ids(dfAssestment["entity_EU"])
+        idsOFAC = entityStore.ids(dfAssestment["entity_OFAC"])
 
-    dfAssestment["in_block"] = np.where(
-        dfAssestment._merge.isin(["both", "left_only"]),
-        True,
-        False
-    )
+        dfAssestment["real"] = groundTruth.contains(idsEU, idsOFAC)
+        dfAssestment["in_block"] = True
 
-    dfAssestment = dfAssestment.drop(
-        columns = ["_merge"]
-    )
+        ## Real matches not in blocks
 
-    ## Retrieve type for all records
+        dfNotInBlock = groundTruth.missing(idsEU, idsOFAC)
+        dfNotInBlock["entity_EU"] = entityStore.lookup("EU", dfNotInBlock["id_EU"])
+        dfNotInBlock["entity_OFAC"] = entityStore.lookup("OFAC", dfNotInBlock["id_OFAC"])
+        dfNotInBlock["real"] = True
+        dfNotInBlock["in_block"] = False
 
-    dfAssestment = dfAssestment.merge(
-        dfDataIds[dfDataIds.source == "EU"][
+        dfAssestment = pd.concat(
             [
-                "id",
-                "type"
-            ]
-        ],
-        left_on = "id_EU",
-        right_on = "id",
-        how = "left"
-    )
+                dfAssestment,
+                dfNotInBlock.drop(columns = ["id_EU", "id_OFAC"])
+            ],
+            ignore_index = True
+        )
 
-    dfAssestment = dfAssestment.drop(
-        columns = ["id"]
-    )
+        ## Retrieve type for all records
 
-# Confusion matrix
+        dfAssestment["type"] = entityStore.types(dfAssestment["entity_EU"])
 
-with timer("Get confusion matrix", processMeasures):
+    # Confusion matrix
 
-    lsCm = []
+    with timer("Get confusion matrix", processMeasures):
 
-    for entityType in BLOKED_TYPES_COLUMNS.keys():
-        for threshold in thresholds:
-            cm = confusion_matrix(
-                dfAssestment,
-                dfDataIds,
-                entityType,
-                "distance_max",
-                "in_block",
-                threshold
-            )            
-            lsCm.append(cm)
-
-    dfCm = pd.DataFrame(lsCm)
-
-# Export results
-
-dfCm.to_excel(
-    FILE_RESULTS, 
-    sheet_name = "data",
-    index = False
-)
-
-dfProcessMeasures = pd.DataFrame(processMeasures)
-dfProcessMeasures.to_excel(
-    FILE_PROCESS_MEASURES, 
-    sheet_name = "data",
-    index = False
-)
\ No newline at end of file
+        lsCm = []
+
+        for entityType in BLOKED_TYPES_COLUMNS.keys():
+            for threshold in thresholds:
+                cm = confusion_matrix(
+                    dfAssestment,
+                    dfDataIds,
+                    entityType,
+                    "distance_max",
+                    "in_block",
+                    threshold
+                )            
+                lsCm.append(cm)
+
+        dfCm = pd.DataFrame(lsCm)
+
+    # Export results
+
+    dfCm.to_excel(
+        FILE_RESULTS, 
+        sheet_name = "data",
+        index = False
+    )
+
+    dfProcessMeasures = pd.DataFrame(processMeasures)
+    dfProcessMeasures.to_excel(
+        FILE_PROCESS_MEASURES, 
+        sheet_name = "data",
+        index = False
+    )
\ No newline at end of file
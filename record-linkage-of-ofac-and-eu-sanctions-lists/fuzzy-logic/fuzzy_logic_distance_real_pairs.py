@@ -19,7 +19,14 @@ if PATH_PROJECT not in sys.path:
 
 import pandas as pd
 import numpy as np
-import recordlinkage
+from support.data_schema import read_data
+from support.ground_truth import GroundTruth
+from support.fingerprints import (
+    FINGERPRINT_NAME_COLUMNS,
+    fingerprint,
+    dedup_by_fingerprint
+)
+from support.string_comparison import compare_pairs
 
 ###############################
 #         Parameters          #
@@ -39,14 +46,18 @@ FILE_RESULTS = os.path.join(PATH_SRC, "fuzzy_logic_distance_real_pairs_percentil
 
 # Data Retrieval
 
-dfOS = pd.read_parquet(
-    FILE_OS,
-    engine = "fastparquet"
-)
+groundTruth = GroundTruth.load(FILE_OS)
 
-dfData = pd.read_parquet(
+dfData = read_data(
     FILE_DATA,
-    engine= "fastparquet"
+    columns = [
+        "source",
+        "id",
+        "type",
+        "record_id",
+        "names_whole_name",
+        "names_whole_name_norm"
+    ]
 )
 
 # Data Preparation
@@ -58,66 +69,29 @@ dfDataNames = dfData[
         "source",
         "id",
         "type",
-        "IDX",
+        "record_id",
         "names_whole_name",
         "names_whole_name_norm"
     ]
 ].copy()
 
-dfDataNames.sort_values(
-    by = [
-        "source",
-        "id",
-        "names_whole_name_norm",
-        "IDX"
-    ],
-    inplace = True
-)
+## First row of each name, by 64-bit fingerprint of source, id and
+## normalized name (no sort of the string columns)
 
-dfDataNames.drop_duplicates(
-    subset=[
-        "source",
-        "id",
-        "names_whole_name_norm"
-    ],
-    keep="first",
-    inplace=True
-)
+dfDataNames["name_fingerprint"] = fingerprint(dfDataNames, FINGERPRINT_NAME_COLUMNS)
+dfDataNames = dedup_by_fingerprint(dfDataNames, "name_fingerprint")
+dfDataNames = dfDataNames.drop(columns = ["name_fingerprint"])
 
 ## Keep only OS ids in data
 
-dfOSInData = dfOS.copy()
-
-maskOsInDataEU = (
-    (~dfOSInData.id_ori_eu.isin(dfData[dfData.source == "EU"].id.unique())) &
-    (dfOSInData.source.isin(["EU", "EU & OFAC"]))
-)
-dfOSInData = dfOSInData[~maskOsInDataEU].copy()
-
-maskOsInDataOFAC = (
-    (~dfOSInData.id_ori_ofac.isin(dfData[dfData.source == "OFAC"].id.unique())) &
-    (dfOSInData.source.isin(["OFAC", "EU & OFAC"]))
-)
-dfOSInData = dfOSInData[~maskOsInDataOFAC].copy()
-
-dfOSInData.rename(
-    columns={
-        "id_ori_eu": "id_EU",
-        "id_ori_ofac": "id_OFAC"
-    },
-    inplace=True
+groundTruth = groundTruth.restrict(
+    dfData[dfData.source == "EU"].id.unique(),
+    dfData[dfData.source == "OFAC"].id.unique()
 )
 
 # Get real pairs
 
-dfOSReal = dfOSInData[
-    dfOSInData.source == "EU & OFAC"
-][
-    [
-        "id_EU",
-        "id_OFAC"
-    ]
-].copy()
+dfOSReal = groundTruth.pairs()
 
 dfOSReal = dfOSReal.merge(
     dfDataNames[
@@ -135,7 +109,7 @@ dfOSReal = dfOSReal.drop(
 dfOSReal.rename(
     columns = {
         "type": "type_EU",
-        "IDX": "IDX_EU",
+        "record_id": "record_id_EU",
         "names_whole_name": "names_whole_name_EU",
         "names_whole_name_norm": "names_whole_name_norm_EU"
     },
@@ -158,7 +132,7 @@ dfOSReal = dfOSReal.drop(
 dfOSReal.rename(
     columns = {
         "type": "type_OFAC",
-        "IDX": "IDX_OFAC",
+        "record_id": "record_id_OFAC",
         "names_whole_name": "names_whole_name_OFAC",
         "names_whole_name_norm": "names_whole_name_norm_OFAC"
     },
@@ -167,45 +141,29 @@ dfOSReal.rename(
 
 # Get real pairs distances
 
+## Pairs of integer record keys, as in fuzzy_logic_confusion_matrix.py
+
 candidatePairs = pd.MultiIndex.from_frame(dfOSReal[
     [
-        'IDX_EU', 
-        'IDX_OFAC'
+        "record_id_EU", 
+        "record_id_OFAC"
     ]
 ])
 
 dfDataNamesComp = dfDataNames.copy()
-dfDataNamesComp.set_index("IDX", inplace=True)
+dfDataNamesComp.set_index("record_id", inplace=True)
 
-compare = recordlinkage.Compare()
-compare.string(
-    'names_whole_name_norm', 
-    'names_whole_name_norm', 
-    method='jarowinkler'
-)
-compare.string(
-    'names_whole_name_norm', 
-    'names_whole_name_norm', 
-    method='cosine'
-)
-dfCompare = compare.compute(
-    candidatePairs, 
-    dfDataNamesComp[dfDataNamesComp.source == "EU"], 
-    dfDataNamesComp[dfDataNamesComp.source == "OFAC"]
+dfCompare = compare_pairs(
+    candidatePairs,
+    dfDataNamesComp[dfDataNamesComp.source == "EU"].names_whole_name_norm,
+    dfDataNamesComp[dfDataNamesComp.source == "OFAC"].names_whole_name_norm
 )
 
 dfCompare.reset_index(inplace=True)
-dfCompare.rename(
-    columns = {
-        0: "distance_jw",
-        1: "distance_cosine"
-    },
-    inplace=True
-)
 
 dfOSReal = dfOSReal.merge(
     dfCompare,
-    on = ["IDX_EU", "IDX_OFAC"],
+    on = ["record_id_EU", "record_id_OFAC"],
     how = "left"
 )
 
@@ -220,8 +178,8 @@ dfOSRealIds.sort_values(
         "id_EU",
         "id_OFAC",
         "distance_max",        
-        "IDX_EU",
-        "IDX_OFAC"
+        "record_id_EU",
+        "record_id_OFAC"
     ],
     ascending=[
         True,
@@ -0,0 +1,475 @@
+###############################
+#            Paths            #
+###############################
+
+import os
+
+PATH_SRC = os.path.dirname(os.path.abspath(__file__))
+PATH_PROJECT = os.path.normpath(os.path.join(PATH_SRC, ".."))
+PATH_DATA = os.path.join(PATH_PROJECT, "data")
+
+###############################
+#          Imports            #
+###############################
+
+import sys
+import ast
+import json
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+###############################
+#         Parameters          #
+###############################
+
+FILE_STAMPS = os.path.join(PATH_DATA, "pipeline_stamps.json")
+
+# Stages: script, input and output artifacts (relative to the project), the
+# parameters of the script and the options of the runner it takes as flags,
+# both part of the stage stamp. The code of the script and of the support
+# modules it imports is always part of it. Stages depend on the stages whose
+# outputs they read
+
+STAGES = {
+    "data_preparation": {
+        "script": "data-preparation/data_preparation.py",
+        "inputs": [
+            "data/20251219-FULL-1_1(xsd).xml",
+            "data/sdn.xml",
+            "support/addresses_city_normalization.csv"
+        ],
+        "outputs": [
+            "data/data_EU_OFAC.parquet",
+            "data/data_EU_OFAC_hashes.parquet"
+        ],
+        "params": [],
+        "options": ["delta", "streaming", "city_fuzzy"]
+    },
+    "open_sanctions": {
+        "script": "data-preparation/open_sanctions.py",
+        "inputs": [
+            "data/targets.nested.EU.json",
+            "data/targets.nested.OFAC.json"
+        ],
+        "outputs": [
+            "data/open_sanctions.parquet"
+        ],
+        "params": [],
+        "options": []
+    },
+    "text_embeddings_computation": {
+        "script": "text-embeddings/text_embeddings_computation.py",
+        "inputs": [
+            "data/data_EU_OFAC.parquet"
+        ],
+        "outputs": [
+            "data/data_text_embeddings.parquet"
+        ],
+        "params": ["RELEVANT_COLS", "MODELS"],
+        "options": []
+    },
+    "text_embeddings_confusion_matrix": {
+        "script": "text-embeddings/text_embeddings_confusion_matrix.py",
+        "inputs": [
+            "data/open_sanctions.parquet",
+            "data/data_text_embeddings.parquet"
+        ],
+        "outputs": [
+            "text-embeddings/text_embeddings_confusion_matrix.xlsx",
+            "data/text_embeddings_confusion_matrix_not_in_minThreshold.xlsx"
+        ],
+        "params": ["NEIGHBORS", "RANGE", "thresholds"],
+        "options": []
+    },
+    "text_embeddings_similarity_real_pairs": {
+        "script": "text-embeddings/text_embeddings_similarity_real_pairs.py",
+        "inputs": [
+            "data/open_sanctions.parquet",
+            "data/data_text_embeddings.parquet"
+        ],
+        "outputs": [
+            "text-embeddings/text_embeddings_similarity_real_pairs_percentiles.xlsx",
+            "data/text_embeddings_similarity_real_pairs_data.xlsx"
+        ],
+        "params": [],
+        "options": []
+    },
+    "fuzzy_logic_confusion_matrix": {
+        "script": "fuzzy-logic/fuzzy_logic_confusion_matrix.py",
+        "inputs": [
+            "data/open_sanctions.parquet",
+            "data/data_EU_OFAC.parquet"
+        ],
+        "outputs": [
+            "fuzzy-logic/fuzzy_logic_confusion_matrix.xlsx"
+        ],
+        "params": ["BLOKED_TYPES_COLUMNS", "RELEVANT_COLS", "thresholds"],
+        "options": []
+    },
+    "fuzzy_logic_distance_real_pairs": {
+        "script": "fuzzy-logic/fuzzy_logic_distance_real_pairs.py",
+        "inputs": [
+            "data/open_sanctions.parquet",
+            "data/data_EU_OFAC.parquet"
+        ],
+        "outputs": [
+            "fuzzy-logic/fuzzy_logic_distance_real_pairs_percentiles.xlsx"
+        ],
+        "params": [],
+        "options": []
+    },
+    "stats": {
+        "script": "stats/stats.py",
+        "inputs": [
+            "data/data_EU_OFAC.parquet"
+        ],
+        "outputs": [
+            "stats/stats.xlsx"
+        ],
+        "params": ["MISSING_COLUMNS_INFO"],
+        "options": []
+    },
+    "comparisons": {
+        "script": "stats/comparisons.py",
+        "inputs": [
+            "data/data_EU_OFAC.parquet"
+        ],
+        "outputs": [],
+        "params": ["COMPARISONS"],
+        "options": []
+    }
+}
+
+# Stages whose scripts take --workers
+
+WORKERS_STAGES = [
+    "data_preparation",
+    "fuzzy_logic_confusion_matrix"
+]
+
+HASH_BLOCK_SIZE = 1 << 20
+
+###############################
+#    Classes and functions    #
+###############################
+
+def projectPath(path):
+
+    return os.path.join(PATH_PROJECT, *path.split("/"))
+
+def getDependencies(stages):
+
+    # Stage -> stages producing its inputs
+
+    producers = {
+        output: stageName
+        for stageName, stageInfo in stages.items()
+        for output in stageInfo["outputs"]
+    }
+
+    return {
+        stageName: sorted({
+            producers[inputFile]
+            for inputFile in stageInfo["inputs"]
+            if inputFile in producers
+        })
+        for stageName, stageInfo in stages.items()
+    }
+
+def getFileHash(path, fileHashes):
+
+    # sha256 of the file contents, reused while its size and mtime do not
+    # change (fileHashes: {path: [size, mtime_ns, sha256]})
+
+    fileStat = os.stat(projectPath(path))
+    cached = fileHashes.get(path)
+    if cached and cached[:2] == [fileStat.st_size, fileStat.st_mtime_ns]:
+        return cached[2]
+
+    fileHash = hashlib.sha256()
+    with open(projectPath(path), "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            fileHash.update(block)
+
+    fileHashes[path] = [fileStat.st_size, fileStat.st_mtime_ns, fileHash.hexdigest()]
+
+    return fileHashes[path][2]
+
+def getCodeHash(path):
+
+    # Hash of the syntax tree, so comments and formatting do not count
+
+    with open(projectPath(path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    return hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest(), tree
+
+def getSupportModules(tree):
+
+    return sorted({
+        node.module.replace(".", "/") + ".py"
+        for node in ast.walk(tree)
+        if isinstance(node, ast.ImportFrom) and
+            node.module and node.module.startswith("support.")
+    })
+
+def getParams(tree, paramNames):
+
+    # Values of the module level assignments of paramNames
+
+    params = {}
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id in paramNames:
+                try:
+                    params[target.id] = ast.literal_eval(node.value)
+                except ValueError:
+                    params[target.id] = ast.unparse(node.value)
+
+    return params
+
+def optionFlag(option):
+
+    return "--" + option.replace("_", "-")
+
+def getStamp(stageInfo, fileHashes, args):
+
+    codeHash, tree = getCodeHash(stageInfo["script"])
+    code = {stageInfo["script"]: codeHash}
+    for module in getSupportModules(tree):
+        code[module] = getCodeHash(module)[0]
+
+    stamp = {
+        "inputs": {
+            inputFile: getFileHash(inputFile, fileHashes)
+            for inputFile in stageInfo["inputs"]
+        },
+        "code": code,
+        "params": {
+            **getParams(tree, stageInfo["params"]),
+            **{
+                optionFlag(option): getattr(args, option)
+                for option in stageInfo["options"]
+            }
+        }
+    }
+    stamp["key"] = hashlib.sha256(
+        json.dumps(stamp, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+    return stamp
+
+def getChanges(stamp, stampOld):
+
+    # What makes a stage out of date, for the log
+
+    if stampOld is None:
+        return ["no previous run"]
+
+    changes = []
+    for part in ["inputs", "code", "params"]:
+        for name in sorted(set(stamp[part]) | set(stampOld.get(part, {}))):
+            if stamp[part].get(name) != stampOld.get(part, {}).get(name):
+                changes.append(f"{part}: {name}")
+
+    return changes
+
+def runStage(stageName, stageInfo, args):
+
+    command = [sys.executable, projectPath(stageInfo["script"])]
+    if stageName in WORKERS_STAGES:
+        command += ["--workers", str(args.workers)]
+    command += [
+        optionFlag(option)
+        for option in stageInfo["options"]
+        if getattr(args, option)
+    ]
+
+    result = subprocess.run(
+        command,
+        cwd=os.path.dirname(projectPath(stageInfo["script"])),
+        capture_output=True,
+        text=True
+    )
+
+    return result
+
+###############################
+#          Process            #
+###############################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Record linkage pipeline runner")
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        help="Stages to run, with the stages they depend on (default all)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=2,
+        help="Stages run in parallel"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes of the stages that have them (WORKERS_STAGES)"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only prepare the list entries changed since the previous run (data_preparation)"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream the XML lists in batches (data_preparation)"
+    )
+    parser.add_argument(
+        "--city-fuzzy",
+        action="store_true",
+        help="Resolve unmapped cities to close spellings of mapped ones (data_preparation)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the stages even if they are up to date"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report the stages out of date"
+    )
+    args = parser.parse_args()
+
+    dependencies = getDependencies(STAGES)
+
+    # Selected stages and their upstream stages
+
+    unknown = [stageName for stageName in args.stages if stageName not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+
+    selected = set()
+    pending = list(args.stages or STAGES)
+    while pending:
+        stageName = pending.pop()
+        if stageName not in selected:
+            selected.add(stageName)
+            pending.extend(dependencies[stageName])
+
+    if os.path.exists(FILE_STAMPS):
+        with open(FILE_STAMPS, encoding="utf-8") as f:
+            stamps = json.load(f)
+    else:
+        stamps = {"stages": {}, "files": {}}
+
+    # Stages are stamped when their upstream stages are done, so the inputs
+    # hashed are the ones they will read. In a dry run, stages downstream of
+    # an out of date stage are reported as out of date
+
+    status = {}
+    started = set()
+    running = {}
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+
+        while True:
+
+            for stageName in STAGES:
+
+                if stageName not in selected or stageName in started:
+                    continue
+                upstream = [status.get(dep) for dep in dependencies[stageName]]
+                if any(s is None for s in upstream):
+                    continue
+
+                started.add(stageName)
+                stageInfo = STAGES[stageName]
+
+                if any(s in ["failed", "blocked"] for s in upstream):
+                    status[stageName] = "blocked"
+                    print(f"[{stageName}] blocked")
+                    continue
+
+                if args.dry_run and "outdated" in upstream:
+                    status[stageName] = "outdated"
+                    print(f"[{stageName}] out of date (upstream stages)")
+                    continue
+
+                missingInputs = [
+                    inputFile for inputFile in stageInfo["inputs"]
+                    if not os.path.exists(projectPath(inputFile))
+                ]
+                if missingInputs:
+                    status[stageName] = "failed"
+                    failed.append(stageName)
+                    print(f"[{stageName}] missing inputs: {', '.join(missingInputs)}")
+                    continue
+
+                stamp = getStamp(stageInfo, stamps["files"], args)
+                stampOld = stamps["stages"].get(stageName)
+                upToDate = (
+                    stampOld is not None and
+                    stampOld["key"] == stamp["key"] and
+                    all(os.path.exists(projectPath(o)) for o in stageInfo["outputs"])
+                )
+
+                if upToDate and not args.force:
+                    status[stageName] = "skipped"
+                    print(f"[{stageName}] up to date")
+                    continue
+
+                changes = ["forced"] if upToDate else getChanges(stamp, stampOld)
+                if not upToDate and stampOld and stampOld["key"] == stamp["key"]:
+                    changes = ["missing outputs"]
+
+                if args.dry_run:
+                    status[stageName] = "outdated"
+                    print(f"[{stageName}] out of date ({'; '.join(changes)})")
+                    continue
+
+                print(f"[{stageName}] running ({'; '.join(changes)})")
+                running[executor.submit(runStage, stageName, stageInfo, args)] = (stageName, stamp)
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stageName, stamp = running.pop(future)
+                result = future.result()
+
+                print(f"============ {stageName} ============")
+                print(result.stdout, end="")
+                print(result.stderr, end="", file=sys.stderr)
+
+                if result.returncode == 0:
+                    status[stageName] = "done"
+                    stamps["stages"][stageName] = stamp
+                    with open(FILE_STAMPS, "w", encoding="utf-8") as f:
+                        json.dump(stamps, f, indent=2, default=str)
+                    print(f"[{stageName}] done")
+                else:
+                    status[stageName] = "failed"
+                    failed.append(stageName)
+                    print(f"[{stageName}] failed (exit code {result.returncode})")
+
+    # Stamps of the files hashed (also in a dry run or when all is up to date)
+
+    if not args.dry_run:
+        with open(FILE_STAMPS, "w", encoding="utf-8") as f:
+            json.dump(stamps, f, indent=2, default=str)
+
+    if failed:
+        sys.exit(1)
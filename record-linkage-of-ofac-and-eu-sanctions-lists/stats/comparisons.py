@@ -18,6 +18,8 @@ if PATH_PROJECT not in sys.path:
 ###############################
 
 import pandas as pd
+from support.data_schema import read_data
+from support.fingerprints import fingerprint, dedup_by_fingerprint
 
 ###############################
 #         Parameters          #
@@ -110,15 +112,13 @@ COMPARISONS = {
 
 # Data Retrieval
 
-dfData = pd.read_parquet(
+dfData = read_data(
     FILE_DATA,
-    engine= "fastparquet"
+    filters = [("names_strong", "==", True)] # Keep only hight quality names
 )
 
 # Comparisons
 
-dfData = dfData[dfData.names_strong].copy() # Keep only hight quality names
-
 comparisonsResults = {
     "comparison": [],
     "type": [],
@@ -135,15 +135,11 @@ comparisonsResults = {
 for compName, compInfo in COMPARISONS.items():
 
     dfDataCompare = dfData.copy()
-    dfDataCompare.sort_values(
-        by=compInfo["dedupCols"],
-        inplace=True
-    )
-    dfDataCompare.drop_duplicates(
-        subset=compInfo["dedupCols"],
-        keep="first",
-        inplace=True
+    dfDataCompare["dedup_fingerprint"] = fingerprint(
+        dfDataCompare,
+        compInfo["dedupCols"]
     )
+    dfDataCompare = dedup_by_fingerprint(dfDataCompare, "dedup_fingerprint")
 #     dfComp = (
 #         dfDataCompare.groupby(
 #             compInfo["groupCols"],
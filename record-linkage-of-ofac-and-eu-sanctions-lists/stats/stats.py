@@ -18,6 +18,7 @@ if PATH_PROJECT not in sys.path:
 ###############################
 
 import pandas as pd
+from support.data_schema import read_data
 
 ###############################
 #         Parameters          #
@@ -71,7 +72,7 @@ MISSING_COLUMNS_INFO = {
 
 # Data Retrieval
 
-dfData = pd.read_parquet(FILE_DATA)
+dfData = read_data(FILE_DATA)
 
 # Different ids
 
@@ -81,7 +82,8 @@ dfGeneralStatsDataSet = dfData.drop_duplicates(
 )
 
 dfGeneralStats = dfGeneralStatsDataSet.groupby(
-    ["source", "type"]  
+    ["source", "type"],
+    observed=True
 ).size().reset_index(name = "num_ids")
 
 # Different names by id
@@ -97,7 +99,8 @@ dfDifferentNamesDataSet.drop_duplicates(
 )
 
 dfDifferentNames = dfDifferentNamesDataSet.groupby(
-    ["source", "type", "names_strong"]    
+    ["source", "type", "names_strong"],
+    observed=True
 ).size().reset_index(name = "num_names_by_id")
 
 # Different normalized names by id
@@ -113,7 +116,8 @@ dfDifferentNormNamesDataSet.drop_duplicates(
 )
 
 dfDifferentNormNames = dfDifferentNormNamesDataSet.groupby(
-    ["source", "type", "names_strong"]    
+    ["source", "type", "names_strong"],
+    observed=True
 ).size().reset_index(name = "num_normalized_names_by_id")
 
 # Different addresses country ISO code
@@ -130,7 +134,8 @@ dfDifferentCountryISODataSet.drop_duplicates(
 
 dfDifferentCountryISO = dfDifferentCountryISODataSet.groupby(
     ["source", "addresses_country_ISO_code"],  
-    dropna=False
+    dropna=False,
+    observed=True
 ).size().reset_index(name = "num_country_ISO_code_by_id")
 
 # Different addresses cities by address country ISO code
@@ -161,7 +166,8 @@ dfDifferentCities = dfDifferentCitiesDataSet.groupby(
        "addresses_city", 
        "addresses_country_ISO_code"
     ],    
-    dropna=False
+    dropna=False,
+    observed=True
 ).size().reset_index(name = "num_cities_by")
 
 # Missing columns analysis
@@ -183,7 +189,8 @@ for missing_column, missing_column_info in MISSING_COLUMNS_INFO.items():
 
     dfMissingColumn = dfMissingColumnDataSet.groupby(
         ["column_name", "source", "type"],
-            as_index=False
+            as_index=False,
+            observed=True
     )[[missing_column_info["col"]]].agg(
         num_records=(missing_column_info["col"], "size"),
         num_missing=(missing_column_info["col"], lambda x: x.isna().sum()),
@@ -0,0 +1,175 @@
+import re
+import csv
+import difflib
+import numpy as np
+import pandas as pd
+
+###############################
+#         Parameters          #
+###############################
+
+CITY_MAPPING_KEYS = [
+    "addresses_city",
+    "addresses_country_ISO_code"
+]
+
+CITY_MAPPING_VALUE = "addresses_city_norm"
+
+CITY_FUZZY_THRESHOLD = 0.90
+
+CITY_FUZZY_NGRAM = 3
+
+NON_ALNUM_REGEX = re.compile(r"[^0-9A-Z]+")
+
+###############################
+#    Classes and functions    #
+###############################
+
+def read_city_mapping(file):
+
+    return pd.read_csv(
+        file,
+        dtype=str,
+        sep=",",
+        keep_default_na=False,
+        quoting=csv.QUOTE_ALL,
+        quotechar='"',
+        encoding='utf-8'
+    )
+
+def city_fuzzy_key(city):
+
+    return " ".join(NON_ALNUM_REGEX.sub(" ", city.upper()).split())
+
+def city_ngrams(key):
+
+    padded = f" {key} "
+    return {
+        padded[i:i + CITY_FUZZY_NGRAM]
+        for i in range(max(1, len(padded) - CITY_FUZZY_NGRAM + 1))
+    }
+
+class CityFuzzyIndex:
+
+    # Spelling variants of the mapped cities (and of their canonical names)
+    # by country: candidates sharing a character n-gram with the city, best
+    # difflib ratio over the threshold (first one on ties)
+
+    def __init__(self, dfMapping, threshold=CITY_FUZZY_THRESHOLD):
+
+        self.threshold = threshold
+        self.keys = {}
+        self.ngrams = {}
+
+        cityNorms = dfMapping[CITY_MAPPING_VALUE].tolist()
+        isoCodes = dfMapping[CITY_MAPPING_KEYS[1]].tolist()
+        targets = (
+            list(zip(dfMapping[CITY_MAPPING_KEYS[0]], isoCodes, cityNorms)) +
+            list(zip(cityNorms, isoCodes, cityNorms))
+        )
+
+        for city, isoCode, cityNorm in targets:
+            key = city_fuzzy_key(city)
+            if not key:
+                continue
+            countryKeys = self.keys.setdefault(isoCode, {})
+            if key in countryKeys:
+                continue
+            countryKeys[key] = cityNorm
+            countryNgrams = self.ngrams.setdefault(isoCode, {})
+            for ngram in city_ngrams(key):
+                countryNgrams.setdefault(ngram, []).append(key)
+
+    def resolve(self, city, isoCode):
+
+        # Canonical city or None
+
+        key = city_fuzzy_key(city)
+        countryKeys = self.keys.get(isoCode)
+        if not key or not countryKeys:
+            return None
+        if key in countryKeys:
+            return countryKeys[key]
+
+        countryNgrams = self.ngrams[isoCode]
+        candidates = dict.fromkeys(
+            candidate
+            for ngram in city_ngrams(key)
+            for candidate in countryNgrams.get(ngram, [])
+        )
+
+        bestScore = self.threshold
+        bestNorm = None
+        for candidate in candidates:
+            score = difflib.SequenceMatcher(None, key, candidate).ratio()
+            if score > bestScore or (score == bestScore and bestNorm is None):
+                bestScore = score
+                bestNorm = countryKeys[candidate]
+
+        return bestNorm
+
+class CityCanonicalizer:
+
+    # (city, ISO code) -> canonical city from the normalization mapping,
+    # hashed on the pair. Cities not mapped are kept as they are, or resolved
+    # with the fuzzy index when there is one
+
+    def __init__(self, dfMapping, fuzzyThreshold=None):
+
+        dfMapping = dfMapping.drop_duplicates()
+        conflicts = dfMapping.duplicated(subset=CITY_MAPPING_KEYS, keep=False)
+        if conflicts.any():
+            raise ValueError(
+                "Cities with more than one normalization: "
+                f"{dfMapping.loc[conflicts, CITY_MAPPING_KEYS].drop_duplicates().values.tolist()}"
+            )
+
+        self.index = pd.MultiIndex.from_frame(dfMapping[CITY_MAPPING_KEYS])
+        self.values = dfMapping[CITY_MAPPING_VALUE].to_numpy(dtype=object)
+        self.fuzzyIndex = (
+            CityFuzzyIndex(dfMapping, fuzzyThreshold)
+            if fuzzyThreshold is not None else None
+        )
+        self.counters = {"mapped": 0, "fuzzy": 0, "unmapped": 0}
+
+    def canonicalize(self, cities, isoCodes):
+
+        # Canonical cities (object array, empty cities as NaN)
+
+        cities = pd.Series(cities).to_numpy(dtype=object)
+        isoCodes = pd.Series(isoCodes).to_numpy(dtype=object)
+
+        positions = self.index.get_indexer(
+            pd.MultiIndex.from_arrays([cities, isoCodes])
+        )
+        mapped = positions >= 0
+
+        cityNorm = cities.copy()
+        cityNorm[mapped] = self.values[positions[mapped]]
+        self.counters["mapped"] += int(mapped.sum())
+
+        if self.fuzzyIndex is not None:
+            unmapped = ~mapped & pd.notna(cities) & pd.notna(isoCodes)
+            dfUnmapped = pd.DataFrame({
+                "city": cities[unmapped],
+                "iso": isoCodes[unmapped]
+            })
+            resolved = {
+                (city, isoCode): self.fuzzyIndex.resolve(city, isoCode)
+                for city, isoCode in dfUnmapped.drop_duplicates().itertuples(index=False)
+            }
+            fuzzyNorm = np.array(
+                [resolved[key] for key in zip(dfUnmapped.city, dfUnmapped.iso)],
+                dtype=object
+            )
+            fuzzyMask = pd.notna(fuzzyNorm)
+            positionsUnmapped = np.flatnonzero(unmapped)
+            cityNorm[positionsUnmapped[fuzzyMask]] = fuzzyNorm[fuzzyMask]
+            mapped[positionsUnmapped[fuzzyMask]] = True
+            self.counters["fuzzy"] += int(fuzzyMask.sum())
+
+        self.counters["unmapped"] += int((~mapped & pd.notna(cities)).sum())
+
+        cityNorm[pd.isna(cityNorm) | (cityNorm == "")] = np.nan
+
+        return cityNorm
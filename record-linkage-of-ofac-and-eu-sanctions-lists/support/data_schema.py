@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+###############################
+#         Parameters          #
+###############################
+
+# Low cardinality columns of the prepared data, stored dictionary encoded
+# in parquet and loaded as pandas categoricals
+
+CATEGORICAL_COLUMNS = [
+    "source",
+    "type",
+    "addresses_city",
+    "addresses_city_norm",
+    "addresses_country_subdivision",
+    "addresses_country_ori",
+    "addresses_country_ISO_code",
+    "addresses_country_desc",
+    "nationalities_country_ori",
+    "nationalities_country_ISO_code",
+    "nationalities_country_desc",
+    "dates_of_birth_year",
+    "dates_of_birth_month",
+    "dates_of_birth_day",
+    "places_of_birth_country_ori",
+    "places_of_birth_country_ISO_code",
+    "places_of_birth_country_desc",
+    "identifications_type",
+    "identifications_country_ori",
+    "identifications_country_ISO_code",
+    "identifications_country_desc",
+    "programs"
+]
+
+BOOLEAN_COLUMNS = [
+    "names_strong"
+]
+
+INTEGER_COLUMNS = {
+    "record_id": "int32",
+    "entity_id": "int32",
+    "row_fingerprint": "uint64",
+    "name_block_fingerprint": "uint64"
+}
+
+# Row groups: one or more by (source, type), with statistics, so readers
+# filtering on them only read the row groups they need
+
+PARTITION_COLUMNS = [
+    "source",
+    "type"
+]
+
+ROW_GROUP_MAX_SIZE = 500000
+
+###############################
+#    Classes and functions    #
+###############################
+
+def compact_data(df):
+
+    # Categorical (sorted categories), nullable boolean (missing values kept)
+    # and integer key dtypes, in place
+
+    for column in CATEGORICAL_COLUMNS:
+        if column not in df.columns:
+            continue
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.set_categories(
+                sorted(df[column].cat.categories)
+            )
+        else:
+            df[column] = df[column].astype("category")
+
+    for column in BOOLEAN_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("boolean")
+
+    for column, dtype in INTEGER_COLUMNS.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+def filter_data(df, filters):
+
+    # Exact rows for filters [(column, op, value), ...] (all must hold)
+
+    mask = pd.Series(True, index=df.index)
+
+    for column, op, value in filters:
+        if op == "==":
+            mask &= df[column] == value
+        elif op == "!=":
+            mask &= df[column] != value
+        elif op == "in":
+            mask &= df[column].isin(value)
+        elif op == "not in":
+            mask &= ~df[column].isin(value)
+        elif op == "<":
+            mask &= df[column] < value
+        elif op == "<=":
+            mask &= df[column] <= value
+        elif op == ">":
+            mask &= df[column] > value
+        elif op == ">=":
+            mask &= df[column] >= value
+        else:
+            raise ValueError(f"Filter operator not supported: {op}")
+
+    return df[mask]
+
+def read_data(file, columns=None, filters=None):
+
+    # Prepared data with its compact schema (categoricals are restored by
+    # fastparquet, objects written before the schema are converted).
+    # Only the columns requested are read, and filters skip the row groups
+    # whose statistics do not match before the rows are filtered
+
+    if filters and columns is not None:
+        readColumns = columns + [
+            column for column, _, _ in filters if column not in columns
+        ]
+    else:
+        readColumns = columns
+
+    df = pd.read_parquet(
+        file,
+        engine="fastparquet",
+        columns=readColumns,
+        filters=filters
+    )
+
+    if filters:
+        df = filter_data(df, filters)
+        if columns is not None:
+            df = df[columns]
+        df = df.reset_index(drop=True)
+
+    return compact_data(df)
+
+def write_data(df, file):
+
+    # Sorted (stable) by PARTITION_COLUMNS, row groups split where they change
+
+    df = compact_data(
+        df.sort_values(by=PARTITION_COLUMNS, kind="stable")
+    ).reset_index(drop=True)
+
+    ## Partition changes on the categorical codes (vectorized)
+
+    partitionCodes = np.column_stack([
+        df[column].cat.codes.to_numpy() for column in PARTITION_COLUMNS
+    ])
+    boundaries = [0] + list(
+        (partitionCodes[1:] != partitionCodes[:-1]).any(axis=1).nonzero()[0] + 1
+    )
+    offsets = []
+    for start, end in zip(boundaries, boundaries[1:] + [len(df)]):
+        offsets.extend(range(start, end, ROW_GROUP_MAX_SIZE))
+
+    df.to_parquet(
+        file,
+        index=False,
+        engine="fastparquet",
+        compression="snappy",
+        row_group_offsets=[int(offset) for offset in offsets] or [0],
+        stats=True
+    )
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+###############################
+#         Parameters          #
+###############################
+
+# Integer keys of the prepared data: record_id (row) and entity_id (list
+# entry, i.e. source and id), both dense from 0
+
+ENTITY_KEY_DTYPE = "int32"
+
+ENTITY_COLUMNS = [
+    "entity_id",
+    "source",
+    "id",
+    "type"
+]
+
+###############################
+#    Classes and functions    #
+###############################
+
+def assign_entity_keys(df):
+
+    # Rows sorted (stable) by source and id, record_id in that order and
+    # entity_id by sorted (source, id). Previous keys are replaced
+
+    df = df.drop(columns=["record_id", "entity_id"], errors="ignore")
+    df = df.sort_values(by=["source", "id"], kind="stable").reset_index(drop=True)
+
+    df.insert(
+        0,
+        "record_id",
+        np.arange(len(df), dtype=ENTITY_KEY_DTYPE)
+    )
+    df.insert(
+        1,
+        "entity_id",
+        df.groupby(["source", "id"], sort=True, observed=True).ngroup()
+        .astype(ENTITY_KEY_DTYPE)
+    )
+
+    return df
+
+class EntityStore:
+
+    # Lookup between the integer keys of the prepared data and the original
+    # list ids. Built from any projection of the prepared data that has
+    # record_id, entity_id, source, id and type
+
+    def __init__(self, df):
+
+        dfEntities = (
+            df.sort_values(by="record_id")
+            .drop_duplicates(subset="entity_id", keep="first")
+            .sort_values(by="entity_id")
+        )
+        self.entities = dfEntities[ENTITY_COLUMNS].reset_index(drop=True)
+
+        # Arrays indexed by entity_id (None for entities not in df)
+
+        self.entityIds = self.entities.entity_id.to_numpy()
+        numEntities = int(self.entityIds.max()) + 1 if len(self.entityIds) else 0
+
+        self.entitySource = np.full(numEntities, None, dtype=object)
+        self.entityOri = np.full(numEntities, None, dtype=object)
+        self.entityType = np.full(numEntities, None, dtype=object)
+        self.entitySource[self.entityIds] = self.entities.source.astype(str).to_numpy()
+        self.entityOri[self.entityIds] = self.entities.id.astype(str).to_numpy()
+        self.entityType[self.entityIds] = self.entities.type.astype(str).to_numpy()
+
+        self.sourceIndex = {
+            source: (
+                pd.Index(dfSource.id.astype(str)),
+                dfSource.entity_id.to_numpy()
+            )
+            for source, dfSource in self.entities.groupby(
+                self.entities.source.astype(str)
+            )
+        }
+
+        self.recordEntity = np.full(
+            int(df.record_id.max()) + 1 if len(df) else 0,
+            -1,
+            dtype=ENTITY_KEY_DTYPE
+        )
+        self.recordEntity[df.record_id.to_numpy()] = df.entity_id.to_numpy()
+
+    def lookup(self, source, ids):
+
+        # entity_id of the original ids of a source, -1 when not in the data
+
+        if source not in self.sourceIndex:
+            return np.full(len(ids), -1, dtype=ENTITY_KEY_DTYPE)
+
+        index, entityIds = self.sourceIndex[source]
+        positions = index.get_indexer(pd.Index(ids).astype(str))
+
+        return np.where(positions >= 0, entityIds[positions], -1).astype(ENTITY_KEY_DTYPE)
+
+    def entities_of(self, recordIds):
+
+        return self.recordEntity[np.asarray(recordIds)]
+
+    def ids(self, entityIds):
+
+        return self.entityOri[np.asarray(entityIds)]
+
+    def types(self, entityIds):
+
+        return self.entityType[np.asarray(entityIds)]
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+###############################
+#         Parameters          #
+###############################
+
+# Stable 64-bit fingerprints of the prepared data (pandas hash of the values,
+# missing values hash the same whatever their representation)
+
+FINGERPRINT_COLUMNS = [
+    "row_fingerprint",
+    "name_block_fingerprint"
+]
+
+# Integer keys, left out of the row fingerprint. IDX stays in it, as in the
+# drop_duplicates() over all the columns it replaces: rows only collapse when
+# their IDX repeats too
+
+ROW_ID_COLUMNS = [
+    "record_id",
+    "entity_id"
+]
+
+# Name block key by entity type: source, id, normalized name and the blocking
+# columns of the fuzzy logic record linkage. Other types: source, id and name
+
+FINGERPRINT_NAME_COLUMNS = [
+    "source",
+    "id",
+    "names_whole_name_norm"
+]
+
+FINGERPRINT_BLOCK_COLUMNS = {
+    "I": [
+        "dates_of_birth_year"
+    ],
+    "O": [
+        "addresses_city_norm",
+        "addresses_country_ISO_code"
+    ]
+}
+
+###############################
+#    Classes and functions    #
+###############################
+
+def fingerprint(df, columns):
+
+    # uint64 per row of df[columns], combined in the order of columns
+
+    return pd.util.hash_pandas_object(
+        df[columns].astype(object),
+        index=False
+    ).to_numpy()
+
+def row_fingerprint(df):
+
+    # All the columns except the fingerprints and the integer keys
+
+    columns = [
+        column for column in df.columns
+        if column not in FINGERPRINT_COLUMNS + ROW_ID_COLUMNS
+    ]
+
+    return fingerprint(df, columns)
+
+def name_block_fingerprint(df):
+
+    fingerprints = fingerprint(df, FINGERPRINT_NAME_COLUMNS)
+
+    for entityType, columnsBlock in FINGERPRINT_BLOCK_COLUMNS.items():
+        mask = (df["type"] == entityType).to_numpy()
+        if mask.any():
+            fingerprints[mask] = fingerprint(
+                df[mask],
+                FINGERPRINT_NAME_COLUMNS + columnsBlock
+            )
+
+    return fingerprints
+
+def dedup_by_fingerprint(df, column):
+
+    # First row of each fingerprint, like drop_duplicates(keep="first")
+
+    return df[~pd.Series(df[column].to_numpy()).duplicated().to_numpy()]
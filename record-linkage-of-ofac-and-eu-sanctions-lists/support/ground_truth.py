@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import pandas as pd
+
+###############################
+#         Parameters          #
+###############################
+
+# True (EU id, OFAC id) pairs: OpenSanctions entities in both lists. Cached
+# next to the OpenSanctions mapping, rebuilt when the mapping is newer
+
+GROUND_TRUTH_SUFFIX = "_pairs.parquet"
+
+GROUND_TRUTH_COLUMNS = [
+    "id_EU",
+    "id_OFAC"
+]
+
+###############################
+#    Classes and functions    #
+###############################
+
+def ground_truth_file(fileOS):
+
+    return os.path.splitext(fileOS)[0] + GROUND_TRUTH_SUFFIX
+
+def read_ground_truth_pairs(fileOS):
+
+    fileCache = ground_truth_file(fileOS)
+
+    if (
+        os.path.exists(fileCache) and
+        os.path.getmtime(fileCache) >= os.path.getmtime(fileOS)
+    ):
+        return pd.read_parquet(fileCache, engine="fastparquet")
+
+    dfOS = pd.read_parquet(
+        fileOS,
+        engine="fastparquet",
+        columns=["source", "id_ori_eu", "id_ori_ofac"]
+    )
+    dfPairs = (
+        dfOS[dfOS.source == "EU & OFAC"][["id_ori_eu", "id_ori_ofac"]]
+        .dropna()
+        .set_axis(GROUND_TRUTH_COLUMNS, axis=1)
+        .astype(str)
+        .drop_duplicates()
+        .reset_index(drop=True)
+    )
+
+    # Written aside and moved, scripts running in parallel may build it too
+
+    fileTmp = f"{fileCache}.{os.getpid()}.tmp"
+    dfPairs.to_parquet(
+        fileTmp,
+        index=False,
+        engine="fastparquet",
+        compression="snappy"
+    )
+    os.replace(fileTmp, fileCache)
+
+    return dfPairs
+
+class GroundTruth:
+
+    # Hashed set of the true pairs: ids coded on their sorted unique values
+    # and pairs as a sorted int64 key array (EU code * number of OFAC ids +
+    # OFAC code), so key order is (id_EU, id_OFAC) order
+
+    def __init__(self, dfPairs):
+
+        self.vocabEU = pd.Index(np.sort(dfPairs.id_EU.unique()))
+        self.vocabOFAC = pd.Index(np.sort(dfPairs.id_OFAC.unique()))
+        self.keys = np.unique(
+            self.pair_keys(dfPairs.id_EU, dfPairs.id_OFAC)
+        )
+
+    @classmethod
+    def load(cls, fileOS):
+
+        return cls(read_ground_truth_pairs(fileOS))
+
+    def pair_keys(self, idsEU, idsOFAC):
+
+        # int64 keys of the pairs, -1 when an id is not in the true pairs
+
+        codesEU = self.vocabEU.get_indexer(pd.Index(idsEU).astype(str))
+        codesOFAC = self.vocabOFAC.get_indexer(pd.Index(idsOFAC).astype(str))
+
+        return np.where(
+            (codesEU >= 0) & (codesOFAC >= 0),
+            codesEU.astype(np.int64) * len(self.vocabOFAC) + codesOFAC,
+            -1
+        )
+
+    def pairs(self, keys=None):
+
+        # DataFrame of the pairs of the keys (all the true pairs by default)
+
+        keys = self.keys if keys is None else keys
+        if len(keys) == 0:
+            return pd.DataFrame(columns=GROUND_TRUTH_COLUMNS, dtype=object)
+
+        return pd.DataFrame({
+            "id_EU": self.vocabEU[keys // len(self.vocabOFAC)],
+            "id_OFAC": self.vocabOFAC[keys % len(self.vocabOFAC)]
+        })
+
+    def restrict(self, idsEU, idsOFAC):
+
+        # True pairs whose ids are both in the data
+
+        dfPairs = self.pairs()
+
+        return GroundTruth(
+            dfPairs[
+                dfPairs.id_EU.isin(pd.Index(idsEU).astype(str)) &
+                dfPairs.id_OFAC.isin(pd.Index(idsOFAC).astype(str))
+            ]
+        )
+
+    def contains(self, idsEU, idsOFAC):
+
+        # Vectorized truth of the pairs (binary search of the keys)
+
+        keys = self.pair_keys(idsEU, idsOFAC)
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+
+        positions = np.searchsorted(self.keys, keys)
+        positions[positions == len(self.keys)] = 0
+
+        return (keys >= 0) & (self.keys[positions] == keys)
+
+    def missing(self, idsEU, idsOFAC):
+
+        # True pairs that are not among the pairs given, in (id_EU, id_OFAC)
+        # order
+
+        keys = self.pair_keys(idsEU, idsOFAC)
+
+        return self.pairs(self.keys[~np.isin(self.keys, keys[keys >= 0])])
@@ -0,0 +1,246 @@
+import os
+import copy
+import lxml.etree as ET
+import inoutlists
+import pandas as pd
+import fastparquet
+
+###############################
+#         Parameters          #
+###############################
+
+# List entry element by loader
+
+ENTRY_TAGS = {
+    inoutlists.LoaderEUXML: "sanctionEntity",
+    inoutlists.LoaderOFACXML: "sdnEntry"
+}
+
+# Columns of inoutlists.DumperPandas output (inoutlists==1.0.3). Fixing them
+# keeps the same schema in all the parquet row groups. A column not in them
+# (another inoutlists version) raises instead of being dropped
+
+RECORD_FIELDS_COLUMNS = {
+    "names": [
+        "whole_name",
+        "strong",
+        "first_name",
+        "last_name"
+    ],
+    "addresses": [
+        "address",
+        "street",
+        "city",
+        "country_subdivision",
+        "country_ori",
+        "country_ISO_code",
+        "country_desc"
+    ],
+    "nationalities": [
+        "country_ori",
+        "country_ISO_code",
+        "country_desc"
+    ],
+    "dates_of_birth": [
+        "date_of_birth",
+        "year",
+        "month",
+        "day"
+    ],
+    "places_of_birth": [
+        "place_of_birth",
+        "street",
+        "city",
+        "country_subdivision",
+        "country_ori",
+        "country_ISO_code",
+        "country_desc"
+    ],
+    "identifications": [
+        "type",
+        "id",
+        "country_ori",
+        "country_ISO_code",
+        "country_desc"
+    ]
+}
+
+LIST_COLUMNS = (
+    ["id", "type"] +
+    [
+        f"{recordField}_{column}"
+        for recordField, columns in RECORD_FIELDS_COLUMNS.items()
+        for column in columns
+    ] +
+    ["programs", "source"]
+)
+
+BOOLEAN_COLUMNS = ["names_strong"]
+
+STREAMING_BATCH_SIZE = 2000
+
+# Separators of the entry text hashed by list_entry_hashes, and the text of
+# missing values
+
+ENTRY_COLUMN_SEP = "\x1f"
+ENTRY_ROW_SEP = "\x1e"
+ENTRY_MISSING = "\x00"
+
+###############################
+#    Classes and functions    #
+###############################
+
+def iter_list_documents(file, loader, batchSize=STREAMING_BATCH_SIZE):
+
+    # XML documents of up to batchSize entries of an EU or OFAC XML file:
+    # its root element, the elements before the first entry (OFAC publishing
+    # information) and the entries. The file is parsed with iterparse and
+    # each entry element is freed once copied, so memory does not depend on
+    # the list size. The parser validates against the loader schema, as
+    # inoutlists.load does, and fails on an invalid element
+
+    schemaPath = loader().schema
+    schema = ET.XMLSchema(ET.parse(str(schemaPath)))
+
+    header = None
+    batchRoot = None
+
+    try:
+        for _, entryEl in ET.iterparse(
+            file,
+            events=("end",),
+            tag=f"{{*}}{ENTRY_TAGS[loader]}",
+            schema=schema
+        ):
+            root = entryEl.getroottree().getroot()
+            if header is None:
+                header = []
+                for el in root:
+                    if el is entryEl:
+                        break
+                    header.append(copy.deepcopy(el))
+
+            if batchRoot is None:
+                batchRoot = ET.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+                batchRoot.extend(copy.deepcopy(el) for el in header)
+            batchRoot.append(copy.deepcopy(entryEl))
+
+            entryEl.clear(keep_tail=True)
+            while entryEl.getprevious() is not None:
+                del entryEl.getparent()[0]
+
+            if len(batchRoot) - len(header) >= batchSize:
+                yield ET.tostring(batchRoot, encoding="unicode")
+                batchRoot = None
+    except ET.XMLSyntaxError as err:
+        raise ValueError(
+            f"Data invalid. Schema: {schemaPath}: {err}"
+        ) from err
+
+    if batchRoot is not None:
+        yield ET.tostring(batchRoot, encoding="unicode")
+
+def list_batch_frame(listData, source):
+
+    # Same rows as inoutlists.dump with DumperPandas, fixed columns and dtypes
+
+    df = inoutlists.dump(listData, inoutlists.DumperPandas)
+    df["source"] = source
+
+    unknownColumns = [column for column in df.columns if column not in LIST_COLUMNS]
+    if unknownColumns:
+        raise ValueError(f"inoutlists columns not in LIST_COLUMNS: {unknownColumns}")
+
+    df = df.reindex(columns=LIST_COLUMNS)
+
+    for column in LIST_COLUMNS:
+        if column in BOOLEAN_COLUMNS:
+            df[column] = df[column].astype("boolean")
+        else:
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+
+    return df
+
+def iter_list_batches(file, loader, source, description="", batchSize=STREAMING_BATCH_SIZE):
+
+    # Each document is loaded with the public inoutlists.load. The parser
+    # reads ahead, so an invalid entry may reach inoutlists.load (which
+    # raises a bare Exception) before iterparse reports it
+
+    for document in iter_list_documents(file, loader, batchSize):
+        try:
+            listData = inoutlists.load(document, loader, description=description)
+        except Exception as err:
+            if not str(err).startswith("Data invalid"):
+                raise
+            raise ValueError(str(err)) from err
+        yield list_batch_frame(listData, source)
+
+def list_entry_hashes(dfDataRaw):
+
+    # uint64 content hash by list entry (source, id): hash of the entry rows
+    # concatenated in a single text, in row order. Only LIST_COLUMNS, in that
+    # order, so the hash does not depend on the loading (the non streaming
+    # frames lack the fields their list does not have, or IDX)
+
+    dfText = dfDataRaw.reindex(columns=LIST_COLUMNS).astype(object)
+    dfText = dfText.where(dfText.notna(), ENTRY_MISSING).astype(str)
+
+    rowsText = dfText[LIST_COLUMNS[0]].str.cat(
+        dfText[LIST_COLUMNS[1:]],
+        sep=ENTRY_COLUMN_SEP
+    )
+    entriesText = rowsText.groupby(
+        [dfDataRaw["source"], dfDataRaw["id"]],
+        sort=False
+    ).agg(ENTRY_ROW_SEP.join)
+
+    dfHashes = entriesText.index.to_frame(index=False)
+    dfHashes["hash"] = pd.util.hash_pandas_object(
+        entriesText,
+        index=False
+    ).to_numpy()
+
+    return dfHashes
+
+def write_lists_parquet(dataSets, fileOut, batchSize=STREAMING_BATCH_SIZE):
+
+    # Streams the lists ({source: {"file", "loader", "description"}}) into a
+    # parquet file, one row group per batch. Returns the number of rows.
+    # Written to a temporary file first, so an invalid list leaves no
+    # partial output
+
+    numRows = 0
+    fileTmp = f"{fileOut}.tmp"
+    objectEncoding = {
+        column: "utf8"
+        for column in LIST_COLUMNS
+        if column not in BOOLEAN_COLUMNS
+    }
+
+    try:
+        for source, dataSetInfo in dataSets.items():
+            for dfBatch in iter_list_batches(
+                dataSetInfo["file"],
+                dataSetInfo["loader"],
+                source,
+                dataSetInfo.get("description", ""),
+                batchSize
+            ):
+                fastparquet.write(
+                    fileTmp,
+                    dfBatch,
+                    write_index=False,
+                    compression="SNAPPY",
+                    object_encoding=objectEncoding,
+                    append=numRows > 0
+                )
+                numRows += len(dfBatch)
+    except BaseException:
+        if os.path.exists(fileTmp):
+            os.remove(fileTmp)
+        raise
+
+    os.replace(fileTmp, fileOut)
+
+    return numRows
@@ -1,6 +1,9 @@
 import re
 import icu
+import sqlite3
 import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 ###############################
 #         Parameters          #
@@ -215,6 +218,36 @@ LEGAL_TERMS = [
 
 LEGAL_REGEX = re.compile("|".join(LEGAL_TERMS), re.IGNORECASE)
 
+# Precompiled patterns and translate tables
+
+SPACES_REGEX = re.compile(r"\s+")
+NON_WORD_REGEX = re.compile(r"[^\w\s]")
+NORMALIZED_NAME_REGEX = re.compile(r"[a-z0-9]+(?: [a-z0-9]+)*")
+LEGAL_TERM_TOKEN_REGEX = re.compile(r"\\b|\\s\+|\[[^\]]+\]|[^\\\[]")
+
+# ASCII translate table: upper case to lower case and any character
+# not in [a-z0-9] to space (steps 4️⃣ and 5️⃣ of normalize_name)
+ASCII_NORM_TABLE = str.maketrans({
+    c: (
+        chr(c).lower() if chr(c).isalnum() else " "
+    )
+    for c in range(128)
+})
+
+# Transliteration and its memo cache. Cached entries are keyed by 
+# NORMALIZATION_VERSION, which must be increased whenever the 
+# transliteration output changes (ICU version is part of the key too)
+
+TRANSLITERATOR_ID = "Any-Latin; Latin-ASCII"
+NORMALIZATION_VERSION = 1
+TRANSLITERATION_CACHE_MAX_SIZE = 200000
+TRANSLITERATION_CACHE_WRITE_BATCH = 10000
+TRANSLITERATION_CACHE_TIMEOUT = 60
+
+# Names by chunk in the multi-process normalization
+
+NORMALIZATION_CHUNK_SIZE = 20000
+
 ###############################
 #    Classes and functions    #
 ###############################
@@ -223,19 +256,174 @@ def normalize_name_basic(name):
     if not isinstance(name, str):
         return ""
     name = unicodedata.normalize("NFKC", name)
-    name = re.sub(r"[^\w\s]", " ", name)
-    name = re.sub(r"\s+", " ", name).strip()
+    name = NON_WORD_REGEX.sub(" ", name)
+    name = SPACES_REGEX.sub(" ", name).strip()
     return name
 
-trans = icu.Transliterator.createInstance("Any-Latin; Latin-ASCII")
+class TransliterationCache:
+
+    # Bounded in-memory LRU in front of the ICU transliterator with an 
+    # optional SQLite store shared across runs. Lookup order: memory, 
+    # disk, ICU. New transliterations are written to disk in batches
+
+    def __init__(
+            self,
+            transliterator,
+            maxSize=TRANSLITERATION_CACHE_MAX_SIZE,
+            path=None
+        ):
+        self.transliterator = transliterator
+        self.maxSize = maxSize
+        self.version = (
+            f"{TRANSLITERATOR_ID}|ICU {icu.ICU_VERSION}|v{NORMALIZATION_VERSION}"
+        )
+        self.memory = OrderedDict()
+        self.pending = []
+        self.db = None
+        self.counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0
+        }
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        self.close()
+        # WAL and a lock timeout: the store may be shared by several workers
+        self.db = sqlite3.connect(path, timeout=TRANSLITERATION_CACHE_TIMEOUT)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transliterations (
+                version TEXT NOT NULL,
+                name TEXT NOT NULL,
+                latin TEXT NOT NULL,
+                PRIMARY KEY (version, name)
+            ) WITHOUT ROWID
+            """
+        )
+        self.db.commit()
+
+    def transliterate(self, text):
+
+        memory = self.memory
+        latin = memory.get(text)
+
+        if latin is not None:
+            memory.move_to_end(text)
+            self.counters["hits"] += 1
+            return latin
+
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT latin FROM transliterations WHERE version = ? AND name = ?",
+                (self.version, text)
+            ).fetchone()
+        else:
+            row = None
+
+        if row is not None:
+            latin = row[0]
+            self.counters["disk_hits"] += 1
+        else:
+            latin = self.transliterator.transliterate(text)
+            self.counters["misses"] += 1
+            if self.db is not None:
+                self.pending.append((self.version, text, latin))
+                if len(self.pending) >= TRANSLITERATION_CACHE_WRITE_BATCH:
+                    self.flush()
+
+        memory[text] = latin
+        while len(memory) > self.maxSize:
+            memory.popitem(last=False)
+
+        return latin
+
+    def flush(self):
+        if self.db is not None and self.pending:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO transliterations VALUES (?, ?, ?)",
+                self.pending
+            )
+            self.db.commit()
+        self.pending = []
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        total = sum(self.counters.values())
+        return {
+            **self.counters,
+            "lookups": total,
+            "hit_ratio": (
+                (self.counters["hits"] + self.counters["disk_hits"]) / total
+                if total > 0
+                else 0
+            ),
+            "memory_size": len(self.memory)
+        }
+
+trans = icu.Transliterator.createInstance(TRANSLITERATOR_ID)
+transCache = TransliterationCache(trans)
+
+def open_transliteration_cache(path):
+    transCache.open(path)
+    return transCache
+
+# Latin-1 (ASCII included) translate table holding the output of steps 
+# 1️⃣ to 5️⃣ of normalize_name for each character. ICU transliterates this 
+# range character by character, so names within it skip ICU and NFKD
+
+LATIN1_NORM_TABLE = str.maketrans({
+    chr(c): (
+        unicodedata.normalize("NFKD", trans.transliterate(chr(c)))
+        .encode("ascii", "ignore")
+        .decode("ascii")
+        .translate(ASCII_NORM_TABLE)
+    )
+    for c in range(256)
+})
+
+# Latin-1 translate table for normalize_name_basic (NFKC and non-word 
+# characters to space), character by character as well
+
+LATIN1_BASIC_TABLE = str.maketrans({
+    chr(c): NON_WORD_REGEX.sub(" ", unicodedata.normalize("NFKC", chr(c)))
+    for c in range(256)
+})
+
+# Names normalized by each path: pure ASCII, Latin-1 only, ICU
+
+normalizationPaths = {
+    "ascii": 0,
+    "latin1": 0,
+    "icu": 0
+}
 
 def normalize_name(text):
 
     if not isinstance(text, str):
         return ""
 
+    # 0️⃣ Fast paths: ASCII (4️⃣ and 5️⃣ only) and Latin-1 (1️⃣ to 5️⃣ 
+    # in one translate)
+    if text.isascii():
+        normalizationPaths["ascii"] += 1
+        return " ".join(text.translate(ASCII_NORM_TABLE).split())
+
+    if max(text) <= "\xff":
+        normalizationPaths["latin1"] += 1
+        return " ".join(text.translate(LATIN1_NORM_TABLE).split())
+
+    normalizationPaths["icu"] += 1
+
     # 1️⃣ Latin transliteration
-    text = trans.transliterate(text)
+    text = transCache.transliterate(text)
 
     # 2️⃣ Unicode normalization
     text = unicodedata.normalize("NFKD", text)
@@ -244,20 +432,315 @@ def normalize_name(text):
     text = text.encode("ascii", "ignore").decode("ascii")
 
     # 4️⃣ Lower case
-    text = text.lower()
-
     # 5️⃣ Remove not [a-z] and not [0-9] characters 
     # (i.e., replace non-alphanumeric characters with spaces)
-    text = re.sub(r"[^a-z0-9]", " ", text)
+    text = text.translate(ASCII_NORM_TABLE)
 
     # 6️⃣ Multiple spaces to single space & trim
-    text = re.sub(r"\s+", " ", text).strip()
+    # (only spaces are left after 5️⃣)
+    text = " ".join(text.split())
 
     return text
 
+def normalize_names(texts) -> list:
+
+    # Batch version of normalize_name: same output, name by name, 
+    # with the lookups resolved once for the whole column
+
+    transliterate = transCache.transliterate
+    normalize = unicodedata.normalize
+    asciiTable = ASCII_NORM_TABLE
+    latin1Table = LATIN1_NORM_TABLE
+    numAscii = numLatin1 = numIcu = 0
+    result = []
+    append = result.append
+
+    for text in texts:
+        if not isinstance(text, str):
+            append("")
+            continue
+        if text.isascii():
+            numAscii += 1
+            text = text.translate(asciiTable)
+        elif max(text) <= "\xff":
+            numLatin1 += 1
+            text = text.translate(latin1Table)
+        else:
+            numIcu += 1
+            text = normalize("NFKD", transliterate(text))
+            text = text.encode("ascii", "ignore").decode("ascii").translate(asciiTable)
+        append(" ".join(text.split()))
+
+    normalizationPaths["ascii"] += numAscii
+    normalizationPaths["latin1"] += numLatin1
+    normalizationPaths["icu"] += numIcu
+
+    return result
+
+def normalize_names_basic(names) -> list:
+
+    # Batch version of normalize_name_basic
+
+    normalize = unicodedata.normalize
+    subNonWord = NON_WORD_REGEX.sub
+    subSpaces = SPACES_REGEX.sub
+    result = []
+    append = result.append
+
+    for name in names:
+        if not isinstance(name, str):
+            append("")
+            continue
+        name = subNonWord(" ", normalize("NFKC", name))
+        append(subSpaces(" ", name).strip())
+
+    return result
+
+def legal_term_patterns(term):
+
+    # Expands a LEGAL_TERMS regex into the literal patterns it matches on 
+    # normalized names: "\s+" is a single space there and "\b" only 
+    # allowed at the start and/or the end of the term
+
+    tokens = LEGAL_TERM_TOKEN_REGEX.findall(term)
+    if "".join(tokens) != term:
+        raise ValueError(f"Legal term not supported: {term!r}")
+
+    startBoundary = tokens[:1] == ["\\b"]
+    endBoundary = len(tokens) > 1 and tokens[-1] == "\\b"
+    tokens = tokens[int(startBoundary):len(tokens) - int(endBoundary)]
+    if "\\b" in tokens or not tokens:
+        raise ValueError(f"Legal term not supported: {term!r}")
+
+    patterns = [""]
+    for token in tokens:
+        if token == "\\s+":
+            options = [" "]
+        elif token.startswith("["):
+            options = list(token[1:-1])
+        else:
+            options = [token.lower()]
+        patterns = [pattern + option for pattern in patterns for option in options]
+
+    return [(pattern, startBoundary, endBoundary) for pattern in patterns]
+
+class LegalFormsAutomaton:
+
+    # Aho-Corasick automaton over the characters of normalized names. 
+    # Matches are resolved like LEGAL_REGEX.sub does: leftmost start first 
+    # and, for the same start, the first term in LEGAL_TERMS order. 
+    # A name is scanned once whatever the number of legal terms. The regex
+    # of the same terms (self.regex) handles names that are not normalized
+
+    def __init__(self, terms=LEGAL_TERMS):
+        self.terms = []
+        self.add_terms(terms)
+
+    def add_terms(self, terms):
+        self.terms.extend(terms)
+        self.build()
+
+    def build(self):
+
+        # Trie
+
+        goto = [{}]
+        outputs = [[]]
+
+        for priority, term in enumerate(self.terms):
+            for pattern, startBoundary, endBoundary in legal_term_patterns(term):
+                state = 0
+                for ch in pattern:
+                    nextState = goto[state].get(ch)
+                    if nextState is None:
+                        nextState = len(goto)
+                        goto[state][ch] = nextState
+                        goto.append({})
+                        outputs.append([])
+                    state = nextState
+                outputs[state].append(
+                    (len(pattern), priority, startBoundary, endBoundary)
+                )
+
+        # Failure links folded into a full transition table (BFS order)
+
+        transitions = [dict(goto[0])]
+        transitions.extend({} for _ in range(len(goto) - 1))
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+
+        for state in queue:
+            transitions[state] = {
+                **transitions[fail[state]],
+                **goto[state]
+            }
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, nextState in goto[state].items():
+                fail[nextState] = transitions[fail[state]].get(ch, 0) if state else 0
+                queue.append(nextState)
+
+        self.transitions = transitions
+        self.outputs = outputs
+        self.regex = re.compile("|".join(self.terms), re.IGNORECASE)
+
+    def sub(self, name):
+
+        # name must be normalized (see NORMALIZED_NAME_REGEX)
+
+        transitions = self.transitions
+        outputs = self.outputs
+        size = len(name)
+        best = {}
+        state = 0
+
+        for pos, ch in enumerate(name):
+            state = transitions[state].get(ch, 0)
+            for length, priority, startBoundary, endBoundary in outputs[state]:
+                start = pos + 1 - length
+                if startBoundary and start > 0 and name[start - 1] != " ":
+                    continue
+                if endBoundary and pos + 1 < size and name[pos + 1] != " ":
+                    continue
+                current = best.get(start)
+                if current is None or priority < current[0]:
+                    best[start] = (priority, pos + 1)
+
+        if not best:
+            return name
+
+        pieces = []
+        end = 0
+        for start in sorted(best):
+            if start >= end:
+                pieces.append(name[end:start])
+                end = best[start][1]
+        pieces.append(name[end:])
+
+        return " ".join(" ".join(pieces).split())
+
+legalForms = LegalFormsAutomaton()
+
 def remove_legal_forms(name: str) -> str:
     if not isinstance(name, str):
         return name
-    name = LEGAL_REGEX.sub(" ", name)
-    name = re.sub(r"\s+", " ", name).strip()
-    return name
\ No newline at end of file
+    if NORMALIZED_NAME_REGEX.fullmatch(name):
+        return legalForms.sub(name)
+    name = legalForms.regex.sub(" ", name)
+    name = SPACES_REGEX.sub(" ", name).strip()
+    return name
+
+def normalize_names_fused(names, organizations) -> dict:
+
+    # Single pass over the raw names producing, as columns:
+    # - norm: normalize_name
+    # - norm_legal: norm without legal forms for organizations (norm otherwise)
+    # - norm_basic: normalize_name_basic
+
+    transliterate = transCache.transliterate
+    normalize = unicodedata.normalize
+    subNonWord = NON_WORD_REGEX.sub
+    removeLegalForms = remove_legal_forms
+    asciiTable = ASCII_NORM_TABLE
+    latin1Table = LATIN1_NORM_TABLE
+    latin1BasicTable = LATIN1_BASIC_TABLE
+    numAscii = numLatin1 = numIcu = 0
+    namesNorm = []
+    namesNormLegal = []
+    namesNormBasic = []
+
+    for name, organization in zip(names, organizations):
+        if not isinstance(name, str):
+            norm = basic = ""
+        elif name.isascii():
+            numAscii += 1
+            norm = name.translate(asciiTable)
+            basic = name.translate(latin1BasicTable)
+        elif max(name) <= "\xff":
+            numLatin1 += 1
+            norm = name.translate(latin1Table)
+            basic = name.translate(latin1BasicTable)
+        else:
+            numIcu += 1
+            norm = normalize("NFKD", transliterate(name))
+            norm = norm.encode("ascii", "ignore").decode("ascii").translate(asciiTable)
+            basic = subNonWord(" ", normalize("NFKC", name))
+        norm = " ".join(norm.split())
+        namesNorm.append(norm)
+        namesNormLegal.append(removeLegalForms(norm) if organization else norm)
+        namesNormBasic.append(" ".join(basic.split()))
+
+    normalizationPaths["ascii"] += numAscii
+    normalizationPaths["latin1"] += numLatin1
+    normalizationPaths["icu"] += numIcu
+
+    return {
+        "norm": namesNorm,
+        "norm_legal": namesNormLegal,
+        "norm_basic": namesNormBasic
+    }
+
+def normalize_names_chunk(names, organizations):
+
+    # normalize_names_fused over a chunk, plus the chunk normalization counters
+
+    pathsIni = dict(normalizationPaths)
+    cacheIni = dict(transCache.counters)
+
+    columns = normalize_names_fused(names, organizations)
+    transCache.flush()
+
+    counters = {
+        **{k: v - pathsIni[k] for k, v in normalizationPaths.items()},
+        **{k: v - cacheIni[k] for k, v in transCache.counters.items()}
+    }
+
+    return columns, counters
+
+def init_normalization_worker(cachePath):
+    # ICU transliterator is created once per worker, on module import
+    if cachePath is not None:
+        open_transliteration_cache(cachePath)
+
+def normalize_names_parallel(
+        names,
+        organizations,
+        workers=1,
+        cachePath=None,
+        chunkSize=NORMALIZATION_CHUNK_SIZE
+    ):
+
+    # Multi-process version of normalize_names_chunk over a whole column. 
+    # Chunks are processed by a pool of workers and results returned in 
+    # the input order. Scripts using it must guard their process with 
+    # if __name__ == "__main__"
+
+    names = list(names)
+    organizations = list(organizations)
+
+    if workers <= 1:
+        init_normalization_worker(cachePath)
+        result = normalize_names_chunk(names, organizations)
+        transCache.close()
+        return result
+
+    chunks = range(0, len(names), chunkSize)
+    columns = {}
+    counters = {}
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_normalization_worker,
+        initargs=(cachePath,)
+    ) as executor:
+        results = executor.map(
+            normalize_names_chunk,
+            [names[i:i + chunkSize] for i in chunks],
+            [organizations[i:i + chunkSize] for i in chunks]
+        )
+        for chunkColumns, chunkCounters in results:
+            for k, v in chunkColumns.items():
+                columns.setdefault(k, []).extend(v)
+            for k, v in chunkCounters.items():
+                counters[k] = counters.get(k, 0) + v
+
+    return columns, counters
@@ -0,0 +1,783 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+from jellyfish import jaro_winkler_similarity
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+###############################
+#         Parameters          #
+###############################
+
+# Character bigrams as recordlinkage's cosine string similarity
+
+COSINE_VECTORIZER_PARAMS = {
+    "analyzer": "char_wb",
+    "strip_accents": "unicode",
+    "ngram_range": (2, 2)
+}
+
+# Pairs scored at once (bounds the gathered n-gram profiles)
+
+COMPARE_CHUNK_SIZE = 200000
+
+COMPARE_COLUMNS = [
+    "distance_jw",
+    "distance_cosine"
+]
+
+# Score of missing names and of names with no n-grams (recordlinkage's
+# missing_value)
+
+COMPARE_MISSING_VALUE = 0.0
+
+COMPARATOR_COUNTERS = [
+    "pairs",
+    "unique_pairs",
+    "pruned_length",
+    "pruned_characters"
+]
+
+# Jaro-Winkler of jellyfish: prefix bonus of 0.1 by character (up to 4) when
+# the Jaro similarity is over 0.7. Upper bounds are compared to the minimum
+# score with a tolerance for the rounding of their computation
+
+JW_PREFIX_SCALE = 0.1
+
+JW_PREFIX_MAX = 4
+
+JW_BOOST_THRESHOLD = 0.7
+
+JW_BOUND_TOLERANCE = 1e-9
+
+# Jaro-Winkler of the pruned pairs (a pair is pruned only when the minimum
+# score is over JW_BOUND_TOLERANCE, so it stays under the minimum score)
+
+JW_PRUNED_VALUE = 0.0
+
+# Left and right suffixes of the columns of the pairs (as recordlinkage)
+
+PAIR_SUFFIXES = ("_1", "_2")
+
+# Scores of the pairs by row positions, and reduction keys (integer codes)
+
+PAIR_SCORE_DTYPES = {
+    "position_left": "int64",
+    "position_right": "int64",
+    "distance_jw": "float64",
+    "distance_cosine": "float64",
+    "distance_max": "float64",
+    "key_left": "int64",
+    "key_right": "int64"
+}
+
+PAIR_KEY_COLUMNS = [
+    "key_left",
+    "key_right"
+]
+
+LAYOUT_ARRAYS = [
+    "left_order",
+    "left_blocks",
+    "right_order",
+    "right_starts",
+    "right_counts"
+]
+
+# Ranges of left rows by worker, scored as they are free (load balance)
+
+COMPARE_TASKS_PER_WORKER = 4
+
+# Worker state of the multi-process scoring, set by init_compare_worker
+
+compareWorker = {}
+
+###############################
+#    Classes and functions    #
+###############################
+
+class NameComparator:
+
+    # Jaro-Winkler and cosine similarities of name pairs, the same scores as
+    # recordlinkage.Compare().string(..., method="jarowinkler" / "cosine").
+    # Each unique name is encoded once: an integer code, its n-gram count
+    # profile and the profile norm. Pairs are given as codes (-1: missing
+    # name, COMPARE_MISSING_VALUE scores) and each unique pair of codes of a
+    # call is scored once. With a minimum score, Jaro-Winkler is not computed
+    # for the pairs whose upper bounds are under it (see
+    # jarowinkler_candidates): they score JW_PRUNED_VALUE, under the minimum
+    # score like their exact score
+
+    def __init__(self, names, minScore=None):
+
+        self.names = pd.Index(pd.unique(pd.Series(names).dropna().astype(str)))
+        self.values = self.names.to_numpy(dtype=object)
+
+        if len(self.names):
+            self.profiles = (
+                CountVectorizer(**COSINE_VECTORIZER_PARAMS)
+                .fit_transform(self.values)
+                .astype(np.float64)
+                .tocsr()
+            )
+            self.norms = np.sqrt(
+                np.asarray(self.profiles.multiply(self.profiles).sum(axis=1)).ravel()
+            )
+        else:
+            self.profiles = None
+            self.norms = np.zeros(0)
+
+        self.minScore = minScore
+        if minScore is not None:
+            self.lengths, self.boundable, self.characters = jw_bound_arrays(self.values)
+
+        self.counters = dict.fromkeys(COMPARATOR_COUNTERS, 0)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+
+        # Comparator of the names, profiles and norms of to_arrays (e.g. in
+        # shared memory), without refitting the profiles
+
+        comparator = cls.__new__(cls)
+
+        offsets = arrays["names_offsets"]
+        text = arrays["names_points"].tobytes().decode("utf-32-le")
+        comparator.values = np.array(
+            [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)],
+            dtype=object
+        )
+        comparator.names = pd.Index(comparator.values)
+        comparator.profiles = csr_from_arrays(arrays, "profiles")
+        comparator.norms = arrays["norms"]
+
+        comparator.minScore = None
+        if "jw_min_score" in arrays:
+            comparator.minScore = float(arrays["jw_min_score"][0])
+            comparator.lengths = arrays["jw_lengths"]
+            comparator.boundable = arrays["jw_boundable"]
+            comparator.characters = csr_from_arrays(arrays, "jw_characters")
+
+        comparator.counters = dict.fromkeys(COMPARATOR_COUNTERS, 0)
+
+        return comparator
+
+    def to_arrays(self):
+
+        # Names as UTF-32 code points and offsets, profiles as CSR arrays
+
+        arrays = {
+            "names_points": np.frombuffer(
+                "".join(self.values).encode("utf-32-le"),
+                dtype=np.uint32
+            ),
+            "names_offsets": np.concatenate(
+                [[0], np.cumsum([len(name) for name in self.values])]
+            ).astype(np.int64),
+            **csr_to_arrays(self.profiles, "profiles"),
+            "norms": self.norms
+        }
+
+        if self.minScore is not None:
+            arrays.update({
+                "jw_min_score": np.array([self.minScore], dtype=np.float64),
+                "jw_lengths": self.lengths,
+                "jw_boundable": self.boundable,
+                **csr_to_arrays(self.characters, "jw_characters")
+            })
+
+        return arrays
+
+    def encode(self, names):
+
+        return self.names.get_indexer(pd.Index(names, dtype=object))
+
+    def jarowinkler_candidates(self, codesLeft, codesRight):
+
+        # Pairs that may score minScore or more. Upper bounds of the similarity
+        # with no transpositions and the longest prefix, from the matching
+        # characters at most: the length of the shortest name, then the
+        # characters both names have (count of each one, the lowest). Names
+        # out of the bounds (not ASCII, see jw_bound_arrays) are candidates
+
+        lengthsLeft = self.lengths[codesLeft]
+        lengthsRight = self.lengths[codesRight]
+        bounded = (
+            self.boundable[codesLeft] &
+            self.boundable[codesRight] &
+            (lengthsLeft > 0) &
+            (lengthsRight > 0)
+        )
+        minBound = self.minScore - JW_BOUND_TOLERANCE
+
+        candidates = ~bounded | (
+            jw_upper_bound(
+                np.minimum(lengthsLeft, lengthsRight),
+                lengthsLeft,
+                lengthsRight
+            ) >= minBound
+        )
+        prunedLength = int((~candidates).sum())
+        self.counters["pruned_length"] += prunedLength
+
+        check = np.flatnonzero(candidates & bounded)
+        for start in range(0, len(check), COMPARE_CHUNK_SIZE):
+            chunk = check[start:start + COMPARE_CHUNK_SIZE]
+            shared = np.asarray(
+                self.characters[codesLeft[chunk]]
+                .minimum(self.characters[codesRight[chunk]])
+                .sum(axis=1)
+            ).ravel()
+            candidates[chunk] = jw_upper_bound(
+                shared,
+                lengthsLeft[chunk],
+                lengthsRight[chunk]
+            ) >= minBound
+        self.counters["pruned_characters"] += int((~candidates).sum()) - prunedLength
+
+        return candidates
+
+    def jarowinkler(self, codesLeft, codesRight):
+
+        # jellyfish (compiled) in a loop over the pairs of names (candidates
+        # only with a minimum score). compare calls it on unique pairs only,
+        # the loop is not vectorized: a numpy kernel over code points was
+        # slower than jellyfish
+
+        scores = np.full(len(codesLeft), COMPARE_MISSING_VALUE)
+        valid = (codesLeft >= 0) & (codesRight >= 0)
+        if self.minScore is not None:
+            named = valid.copy()
+            valid[valid] = self.jarowinkler_candidates(
+                codesLeft[valid],
+                codesRight[valid]
+            )
+            scores[named & ~valid] = JW_PRUNED_VALUE
+        scores[valid] = [
+            jaro_winkler_similarity(nameLeft, nameRight)
+            for nameLeft, nameRight in zip(
+                self.values[codesLeft[valid]],
+                self.values[codesRight[valid]]
+            )
+        ]
+
+        return scores
+
+    def cosine(self, codesLeft, codesRight):
+
+        # Row-wise dot products of the profiles over the product of norms
+        # (names with no n-grams, norm 0, score COMPARE_MISSING_VALUE)
+
+        scores = np.full(len(codesLeft), COMPARE_MISSING_VALUE)
+        valid = np.flatnonzero((codesLeft >= 0) & (codesRight >= 0))
+
+        for start in range(0, len(valid), COMPARE_CHUNK_SIZE):
+            chunk = valid[start:start + COMPARE_CHUNK_SIZE]
+            left = codesLeft[chunk]
+            right = codesRight[chunk]
+            dot = np.asarray(
+                self.profiles[left].multiply(self.profiles[right]).sum(axis=1)
+            ).ravel()
+            norms = self.norms[left] * self.norms[right]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores[chunk] = np.where(
+                    norms > 0,
+                    dot / norms,
+                    COMPARE_MISSING_VALUE
+                )
+
+        return scores
+
+    def compare(self, codesLeft, codesRight):
+
+        codesLeft = np.asarray(codesLeft)
+        codesRight = np.asarray(codesRight)
+
+        # Unique pairs of names (int64 key left code * number of names + right
+        # code), scores broadcast back to the pairs
+
+        scores = {
+            column: np.full(len(codesLeft), COMPARE_MISSING_VALUE)
+            for column in COMPARE_COLUMNS
+        }
+        valid = (codesLeft >= 0) & (codesRight >= 0)
+        keys, inverse = np.unique(
+            codesLeft[valid].astype(np.int64) * len(self.names) + codesRight[valid],
+            return_inverse=True
+        )
+        uniqueLeft = keys // max(len(self.names), 1)
+        uniqueRight = keys % max(len(self.names), 1)
+
+        scores["distance_jw"][valid] = self.jarowinkler(uniqueLeft, uniqueRight)[inverse]
+        scores["distance_cosine"][valid] = self.cosine(uniqueLeft, uniqueRight)[inverse]
+
+        self.counters["pairs"] += int(valid.sum())
+        self.counters["unique_pairs"] += len(keys)
+
+        return scores
+
+    def stats(self):
+
+        return {
+            **self.counters,
+            "dedup_ratio": (
+                self.counters["pairs"] / self.counters["unique_pairs"]
+                if self.counters["unique_pairs"] > 0
+                else 0
+            )
+        }
+
+def csr_to_arrays(matrix, prefix):
+
+    if matrix is None:
+        matrix = csr_matrix((0, 0), dtype=np.float64)
+
+    return {
+        f"{prefix}_data": matrix.data,
+        f"{prefix}_indices": matrix.indices,
+        f"{prefix}_indptr": matrix.indptr,
+        f"{prefix}_shape": np.array(matrix.shape, dtype=np.int64)
+    }
+
+def csr_from_arrays(arrays, prefix):
+
+    shape = tuple(int(n) for n in arrays[f"{prefix}_shape"])
+    if shape[0] == 0:
+        return None
+
+    return csr_matrix(
+        (
+            arrays[f"{prefix}_data"],
+            arrays[f"{prefix}_indices"],
+            arrays[f"{prefix}_indptr"]
+        ),
+        shape=shape
+    )
+
+def jw_bound_arrays(values):
+
+    # Lengths of the names, names the bounds apply to and their character
+    # count profiles. jellyfish compares grapheme clusters: the same as
+    # characters for ASCII names (CR LF aside), the normalized names
+
+    lengths = np.array([len(name) for name in values], dtype=np.int64)
+    boundable = np.array(
+        [name.isascii() and "\r" not in name for name in values],
+        dtype=bool
+    )
+    characters = (
+        CountVectorizer(analyzer=list, dtype=np.int32)
+        .fit_transform(values)
+        .tocsr()
+        if len(values) else None
+    )
+
+    return lengths, boundable, characters
+
+def jw_upper_bound(matches, lengthsLeft, lengthsRight):
+
+    # Jaro-Winkler with the matching characters, no transpositions and the
+    # prefix bonus of the shortest name (up to JW_PREFIX_MAX)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jaro = np.where(
+            matches > 0,
+            (matches / lengthsLeft + matches / lengthsRight + 1) / 3,
+            0.0
+        )
+    prefix = np.minimum(np.minimum(lengthsLeft, lengthsRight), JW_PREFIX_MAX)
+
+    return np.where(
+        jaro > JW_BOOST_THRESHOLD,
+        jaro + JW_PREFIX_SCALE * prefix * (1 - jaro),
+        jaro
+    )
+
+def pair_codes(codes, positions):
+
+    # Name codes of the records at the positions (-1: record not found)
+
+    return np.where(positions >= 0, codes[positions], -1)
+
+def compare_pairs(pairs, namesLeft, namesRight, comparator=None):
+
+    # Scores of the candidate pairs (MultiIndex of namesLeft x namesRight
+    # index values), indexed by the pairs, columns COMPARE_COLUMNS. A
+    # comparator of the names can be given to keep its counters
+
+    if comparator is None:
+        comparator = NameComparator(pd.concat([namesLeft, namesRight]))
+
+    codesLeft = pair_codes(
+        comparator.encode(namesLeft),
+        namesLeft.index.get_indexer(pairs.get_level_values(0))
+    )
+    codesRight = pair_codes(
+        comparator.encode(namesRight),
+        namesRight.index.get_indexer(pairs.get_level_values(1))
+    )
+
+    return pd.DataFrame(
+        comparator.compare(codesLeft, codesRight),
+        index=pairs,
+        columns=COMPARE_COLUMNS
+    )
+
+def block_codes(dfLeft, dfRight, columnsBlock):
+
+    # Block of the left and right rows, as recordlinkage.index.Block: rows
+    # with a missing blocking value are in no block (-1)
+
+    codes = (
+        pd.concat(
+            [dfLeft[columnsBlock], dfRight[columnsBlock]],
+            ignore_index=True
+        )
+        .groupby(columnsBlock, sort=False, observed=True, dropna=True)
+        .ngroup()
+        .fillna(-1)
+        .to_numpy(dtype=np.int64)
+    )
+
+    return codes[:len(dfLeft)], codes[len(dfLeft):]
+
+def block_layout(blocksLeft, blocksRight):
+
+    # Left rows in block order (blocks with right rows only) and where the
+    # right rows of each block are in rightOrder (start and count)
+
+    numBlocks = max(blocksLeft.max(initial=-1), blocksRight.max(initial=-1)) + 1
+
+    rightOrder = np.argsort(blocksRight, kind="stable")
+    startsRight = np.searchsorted(blocksRight[rightOrder], np.arange(numBlocks))
+    countsRight = np.bincount(blocksRight[blocksRight >= 0], minlength=numBlocks)
+
+    leftOrder = np.argsort(blocksLeft, kind="stable")
+    leftOrder = leftOrder[blocksLeft[leftOrder] >= 0]
+    leftOrder = leftOrder[countsRight[blocksLeft[leftOrder]] > 0]
+
+    return {
+        "left_order": leftOrder,
+        "left_blocks": blocksLeft[leftOrder],
+        "right_order": rightOrder,
+        "right_starts": startsRight,
+        "right_counts": countsRight
+    }
+
+def iter_layout_pairs(layout, start, end, chunkSize=COMPARE_CHUNK_SIZE):
+
+    # Candidate pairs of the left rows start:end of the layout as (left,
+    # right) row positions, in chunks of at most chunkSize pairs: each left
+    # row with all the right rows of its block (a left row alone may go over
+    # chunkSize)
+
+    leftOrder = layout["left_order"][start:end]
+    leftBlocks = layout["left_blocks"][start:end]
+    weights = layout["right_counts"][leftBlocks]
+    ends = np.cumsum(weights)
+
+    row = 0
+    while row < len(leftOrder):
+        offset = ends[row - 1] if row > 0 else 0
+        rowEnd = max(
+            int(np.searchsorted(ends, offset + chunkSize, side="right")),
+            row + 1
+        )
+        rowWeights = weights[row:rowEnd]
+        within = (
+            np.arange(int(rowWeights.sum())) -
+            np.repeat(np.cumsum(rowWeights) - rowWeights, rowWeights)
+        )
+        yield (
+            np.repeat(leftOrder[row:rowEnd], rowWeights),
+            layout["right_order"][
+                np.repeat(layout["right_starts"][leftBlocks[row:rowEnd]], rowWeights) +
+                within
+            ]
+        )
+        row = rowEnd
+
+def iter_block_pairs(blocksLeft, blocksRight, chunkSize=COMPARE_CHUNK_SIZE):
+
+    # Candidate pairs of the blocks, as iter_layout_pairs over all left rows
+
+    layout = block_layout(blocksLeft, blocksRight)
+
+    return iter_layout_pairs(layout, 0, len(layout["left_order"]), chunkSize)
+
+def layout_tasks(layout, numTasks):
+
+    # Contiguous ranges of the left rows of the layout with about the same
+    # number of pairs (|left block| x |right block| summed over the blocks)
+
+    ends = np.cumsum(layout["right_counts"][layout["left_blocks"]])
+    if len(ends) == 0:
+        return []
+
+    bounds = np.unique(np.concatenate([
+        [0],
+        np.searchsorted(
+            ends,
+            ends[-1] * np.arange(1, numTasks) / numTasks,
+            side="right"
+        ),
+        [len(ends)]
+    ]))
+
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+def best_pairs(dfPairs, columns):
+
+    # Pair of highest distance_max by the columns (first one on ties)
+
+    return (
+        dfPairs.sort_values(
+            by=columns + ["distance_max"],
+            ascending=[True] * len(columns) + [False],
+            kind="stable"
+        )
+        .drop_duplicates(subset=columns, keep="first")
+    )
+
+def merge_pairs(lsPairs, reduce):
+
+    # Partial scores of score_layout as one, reduced again by the keys
+
+    if not lsPairs:
+        return pd.DataFrame({
+            column: pd.Series(dtype=dtype)
+            for column, dtype in PAIR_SCORE_DTYPES.items()
+            if reduce or column not in PAIR_KEY_COLUMNS
+        })
+
+    dfPairs = pd.concat(lsPairs, ignore_index=True)
+
+    return best_pairs(dfPairs, PAIR_KEY_COLUMNS) if reduce else dfPairs
+
+def score_layout(
+        comparator,
+        layout,
+        codesLeft,
+        codesRight,
+        keysLeft,
+        keysRight,
+        start,
+        end,
+        chunkSize=COMPARE_CHUNK_SIZE,
+        floor=None
+    ):
+
+    # Scores of the pairs of the left rows start:end of the layout, streamed
+    # by chunks (columns PAIR_SCORE_DTYPES): pairs under the floor dropped
+    # and, with keys (integer codes of the rows), only the best pair of each
+    # pair of keys
+
+    reduce = keysLeft is not None
+
+    lsPairs = []
+    numPairs = 0
+    mergeAt = chunkSize
+
+    for positionsLeft, positionsRight in iter_layout_pairs(
+            layout,
+            start,
+            end,
+            chunkSize
+        ):
+
+        dfPairs = pd.DataFrame({
+            "position_left": positionsLeft,
+            "position_right": positionsRight,
+            **comparator.compare(
+                codesLeft[positionsLeft],
+                codesRight[positionsRight]
+            )
+        })
+        dfPairs["distance_max"] = dfPairs[COMPARE_COLUMNS].max(axis=1)
+
+        if floor is not None:
+            dfPairs = dfPairs[dfPairs.distance_max >= floor]
+        if reduce:
+            dfPairs["key_left"] = keysLeft[dfPairs.position_left.to_numpy()]
+            dfPairs["key_right"] = keysRight[dfPairs.position_right.to_numpy()]
+            dfPairs = best_pairs(dfPairs, PAIR_KEY_COLUMNS)
+
+        lsPairs.append(dfPairs)
+        numPairs += len(dfPairs)
+
+        ## Partial results merged when they double (or go over a chunk)
+
+        if reduce and numPairs > mergeAt and len(lsPairs) > 1:
+            lsPairs = [merge_pairs(lsPairs, reduce)]
+            numPairs = len(lsPairs[0])
+            mergeAt = max(chunkSize, 2 * numPairs)
+
+    return merge_pairs(lsPairs, reduce)
+
+def share_arrays(arrays):
+
+    # Copies of numpy arrays in shared memory: the blocks (to be closed and
+    # unlinked by the owner) and the spec to attach them (name, shape, dtype)
+
+    blocks = []
+    spec = {}
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+
+    return blocks, spec
+
+def attach_arrays(spec):
+
+    blocks = []
+    arrays = {}
+
+    for name, (blockName, shape, dtype) in spec.items():
+        block = SharedMemory(name=blockName)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    return blocks, arrays
+
+def init_compare_worker(spec, chunkSize, floor):
+
+    # Names, layout and codes attached once per worker (kept with the blocks)
+
+    blocks, arrays = attach_arrays(spec)
+
+    compareWorker.update({
+        "blocks": blocks,
+        "arrays": arrays,
+        "comparator": NameComparator.from_arrays(arrays),
+        "layout": {k: arrays[k] for k in LAYOUT_ARRAYS},
+        "chunkSize": chunkSize,
+        "floor": floor
+    })
+
+def score_compare_task(start, end):
+
+    # score_layout over a range of left rows, plus the comparator counters
+
+    comparator = compareWorker["comparator"]
+    arrays = compareWorker["arrays"]
+    countersIni = dict(comparator.counters)
+
+    dfPairs = score_layout(
+        comparator,
+        compareWorker["layout"],
+        arrays["codes_left"],
+        arrays["codes_right"],
+        arrays.get("keys_left"),
+        arrays.get("keys_right"),
+        start,
+        end,
+        compareWorker["chunkSize"],
+        compareWorker["floor"]
+    )
+
+    return dfPairs, {
+        k: v - countersIni[k] for k, v in comparator.counters.items()
+    }
+
+def compare_blocks(
+        dfLeft,
+        dfRight,
+        columnsBlock,
+        column,
+        comparator=None,
+        chunkSize=COMPARE_CHUNK_SIZE,
+        floor=None,
+        reduceOn=None,
+        workers=1
+    ):
+
+    # Blocking and scoring streamed by chunks of candidate pairs: the index
+    # values of the pairs (named as recordlinkage), COMPARE_COLUMNS and
+    # distance_max. Pairs under the floor are dropped and, with reduceOn (a
+    # column of both sides), only the best pair by its left and right values
+    # is kept. Memory goes with the chunk size and the pairs kept.
+    # With workers, ranges of left rows balanced by pairs are scored by a pool
+    # of processes attached to the names and codes in shared memory. Scripts
+    # using it must guard their process with if __name__ == "__main__"
+
+    if comparator is None:
+        comparator = NameComparator(pd.concat([dfLeft[column], dfRight[column]]))
+
+    namesIndex = [dfLeft.index.name, dfRight.index.name]
+    if namesIndex[0] == namesIndex[1]:
+        namesIndex = [f"{namesIndex[0]}{suffix}" for suffix in PAIR_SUFFIXES]
+
+    arrays = {
+        **block_layout(*block_codes(dfLeft, dfRight, columnsBlock)),
+        "codes_left": comparator.encode(dfLeft[column]),
+        "codes_right": comparator.encode(dfRight[column])
+    }
+    if reduceOn is not None:
+        keys = pd.factorize(
+            pd.concat([dfLeft[reduceOn], dfRight[reduceOn]], ignore_index=True)
+        )[0].astype(np.int64)
+        arrays["keys_left"] = keys[:len(dfLeft)]
+        arrays["keys_right"] = keys[len(dfLeft):]
+
+    tasks = layout_tasks(arrays, max(workers, 1) * COMPARE_TASKS_PER_WORKER)
+
+    if workers <= 1 or len(tasks) <= 1:
+
+        dfPairs = score_layout(
+            comparator,
+            {k: arrays[k] for k in LAYOUT_ARRAYS},
+            arrays["codes_left"],
+            arrays["codes_right"],
+            arrays.get("keys_left"),
+            arrays.get("keys_right"),
+            0,
+            len(arrays["left_order"]),
+            chunkSize,
+            floor
+        )
+
+    else:
+
+        blocks, spec = share_arrays({**comparator.to_arrays(), **arrays})
+        lsPairs = []
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_compare_worker,
+                initargs=(spec, chunkSize, floor)
+            ) as executor:
+                results = executor.map(
+                    score_compare_task,
+                    [start for start, _ in tasks],
+                    [end for _, end in tasks]
+                )
+                for dfTask, counters in results:
+                    lsPairs.append(dfTask)
+                    for k, v in counters.items():
+                        comparator.counters[k] += v
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        dfPairs = merge_pairs(lsPairs, reduceOn is not None)
+
+    positionsLeft = dfPairs.position_left.to_numpy()
+    positionsRight = dfPairs.position_right.to_numpy()
+
+    dfResult = pd.DataFrame({
+        namesIndex[0]: dfLeft.index.to_numpy()[positionsLeft],
+        namesIndex[1]: dfRight.index.to_numpy()[positionsRight],
+        **{k: dfPairs[k].to_numpy() for k in COMPARE_COLUMNS + ["distance_max"]}
+    })
+    if reduceOn is not None:
+        dfResult[f"{reduceOn}{PAIR_SUFFIXES[0]}"] = dfLeft[reduceOn].to_numpy()[positionsLeft]
+        dfResult[f"{reduceOn}{PAIR_SUFFIXES[1]}"] = dfRight[reduceOn].to_numpy()[positionsRight]
+
+    return dfResult
@@ -0,0 +1,7 @@
+import os
+import sys
+
+PATH_PROJECT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+if PATH_PROJECT not in sys.path:
+    sys.path.append(PATH_PROJECT)
@@ -0,0 +1,60 @@
+import fastparquet
+import pandas as pd
+
+from support import data_schema
+from support.data_schema import compact_data, read_data, write_data
+
+def prepared():
+
+    return pd.DataFrame({
+        "source": ["EU", "EU", "OFAC", "OFAC"],
+        "type": ["I", "O", "I", "O"],
+        "id": ["1", "2", "3", "4"],
+        "names_strong": pd.Series([True, None, False, True], dtype=object)
+    })
+
+def test_missing_names_strong_kept_missing():
+
+    df = compact_data(prepared())
+
+    assert df.names_strong.dtype == "boolean"
+    assert df.names_strong.isna().tolist() == [False, True, False, False]
+    assert df[df.names_strong.fillna(False)].id.tolist() == ["1", "4"]
+
+def test_names_strong_round_trip(tmp_path):
+
+    file = tmp_path / "data.parquet"
+    write_data(prepared(), file)
+
+    df = read_data(file)
+
+    assert df.names_strong.dtype == "boolean"
+    assert df.names_strong.isna().tolist() == [False, True, False, False]
+
+    dfStrong = read_data(file, columns=["id"], filters=[("names_strong", "==", True)])
+
+    assert dfStrong.id.tolist() == ["1", "4"]
+
+def test_row_groups_by_partition(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(data_schema, "ROW_GROUP_MAX_SIZE", 2)
+
+    df = pd.DataFrame({
+        "source": ["OFAC", "EU", "EU", "OFAC", "EU", "EU", "EU"],
+        "type": ["I", "O", "I", "I", "I", "I", None],
+        "id": ["1", "2", "3", "4", "5", "6", "7"]
+    })
+    file = tmp_path / "data.parquet"
+    write_data(df, file)
+
+    ## EU/I (3 rows: 2 groups), EU/O, EU/missing and OFAC/I
+
+    dfRowGroups = [
+        dfRowGroup[["source", "type"]].astype(str).drop_duplicates().values.tolist()
+        for dfRowGroup in fastparquet.ParquetFile(file).iter_row_groups()
+    ]
+
+    assert dfRowGroups == [
+        [["EU", "I"]], [["EU", "I"]], [["EU", "O"]], [["EU", "nan"]], [["OFAC", "I"]]
+    ]
+    assert read_data(file).id.tolist() == ["3", "5", "6", "2", "7", "1", "4"]
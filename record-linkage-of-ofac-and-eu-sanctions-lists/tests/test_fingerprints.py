@@ -0,0 +1,35 @@
+import pandas as pd
+
+from support.fingerprints import dedup_by_fingerprint, row_fingerprint
+
+def records():
+
+    return pd.DataFrame({
+        "source": ["EU", "EU", "EU", "EU"],
+        "id": ["EU.1", "EU.1", "EU.1", "EU.1"],
+        "type": ["I", "I", "I", "I"],
+        "names_whole_name": ["Ivan Petrov", "Ivan Petrov", "Ivan Petrova", "Ivan Petrov"],
+        "dates_of_birth_year": ["1970", "1970", None, "1970"],
+        "IDX": ["EU.1-0", "EU.1-1", "EU.1-2", "EU.1-0"]
+    })
+
+def test_dedup_matches_drop_duplicates():
+
+    # Same rows as drop_duplicates() over all the columns: identical records
+    # with another IDX are kept
+
+    df = records()
+    df["row_fingerprint"] = row_fingerprint(df)
+
+    dfDedup = dedup_by_fingerprint(df, "row_fingerprint")
+
+    assert dfDedup.index.tolist() == records().drop_duplicates().index.tolist()
+    assert dfDedup.IDX.tolist() == ["EU.1-0", "EU.1-1", "EU.1-2"]
+
+def test_row_fingerprint_ignores_integer_keys():
+
+    df = records()
+    dfKeys = df.assign(record_id=[7, 8, 9, 10], entity_id=[3, 3, 3, 3])
+
+    assert (row_fingerprint(df) == row_fingerprint(dfKeys)).all()
+    assert row_fingerprint(df)[0] != row_fingerprint(df)[1]
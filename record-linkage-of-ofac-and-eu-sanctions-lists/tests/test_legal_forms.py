@@ -0,0 +1,123 @@
+import os
+
+import inoutlists
+import pandas as pd
+import pytest
+
+from support.name_normalization import (
+    LEGAL_REGEX,
+    LEGAL_TERMS,
+    NORMALIZED_NAME_REGEX,
+    LegalFormsAutomaton,
+    legal_term_patterns,
+    legalForms,
+    normalize_names,
+    remove_legal_forms
+)
+
+PATH_PROJECT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PATH_FIXTURES = os.path.join(PATH_PROJECT, "tests", "fixtures")
+
+FIXTURE_LISTS = [
+    (os.path.join(PATH_FIXTURES, "eu.xml"), inoutlists.LoaderEUXML),
+    (os.path.join(PATH_FIXTURES, "sdn.xml"), inoutlists.LoaderOFACXML)
+]
+
+EDGE_CASES = [
+    "s a",
+    "s a de c v",
+    "sa de cv",
+    "grupo s a p i de c v",
+    "alfa s de r l de c v",
+    "o o o romashka",
+    "romashka o o o",
+    "l l c global trade",
+    "g m b h",
+    "bank of tehran co",
+    "co",
+    "cosa nostra",
+    "saco",
+    "mesa sa",
+    "sa sa sa",
+    "ltdco",
+    "limited liability company limited",
+    "incorporated company of iran",
+    "companyx",
+    "xcompany",
+    "gesellschaft mit beschrankter haftung berlin",
+    "ag ag",
+    "a g b",
+    "pjsc jsc",
+    "publichnoe aktsionernoe obshchestvo sberbank",
+    "sherkat ba masouliyat mahdoodsherkat sahami",
+    "npo of",
+    "ss ss",
+    "x",
+    ""
+]
+
+def reference(name):
+
+    return " ".join(LEGAL_REGEX.sub(" ", name).split())
+
+def term_names():
+
+    # Each literal form of each term alone, between words, glued to words
+
+    names = []
+    for term in LEGAL_TERMS:
+        for pattern, _, _ in legal_term_patterns(term):
+            names += [
+                pattern,
+                f"alpha {pattern}",
+                f"{pattern} omega",
+                f"alpha {pattern} omega",
+                f"alpha{pattern} omega",
+                f"alpha {pattern}omega"
+            ]
+    return names
+
+@pytest.mark.parametrize("name", EDGE_CASES)
+def test_edge_cases_match_regex(name):
+
+    assert legalForms.sub(name) == reference(name)
+
+def test_all_term_forms_match_regex():
+
+    mismatches = [
+        name for name in term_names()
+        if legalForms.sub(name) != reference(name)
+    ]
+
+    assert mismatches == []
+
+def test_fixture_organizations_match_regex():
+
+    dfData = pd.concat(
+        [
+            inoutlists.dump(inoutlists.load(file, loader), inoutlists.DumperPandas)
+            for file, loader in FIXTURE_LISTS
+        ],
+        ignore_index=True
+    )
+    names = normalize_names(dfData[dfData.type == "O"].names_whole_name.unique())
+
+    mismatches = [name for name in names if legalForms.sub(name) != reference(name)]
+
+    assert "bnc s a" in names
+    assert mismatches == []
+
+def test_added_terms_reach_both_paths():
+
+    automaton = LegalFormsAutomaton(LEGAL_TERMS)
+    automaton.add_terms([r"\bkft\b"])
+
+    assert automaton.sub("alpha kft") == "alpha"
+    assert " ".join(automaton.regex.sub(" ", "Alpha KFT.").split()) == "Alpha ."
+
+def test_names_not_normalized_use_the_term_regex():
+
+    name = "Alpha, S.A. de C.V."
+
+    assert not NORMALIZED_NAME_REGEX.fullmatch(name)
+    assert remove_legal_forms(name) == " ".join(legalForms.regex.sub(" ", name).split())
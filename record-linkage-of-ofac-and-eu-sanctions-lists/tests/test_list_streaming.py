@@ -0,0 +1,185 @@
+import os
+import inoutlists
+import pandas as pd
+import pytest
+
+from support import list_streaming
+from support.list_streaming import (
+    LIST_COLUMNS,
+    iter_list_documents,
+    list_entry_hashes,
+    write_lists_parquet
+)
+
+PATH_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DATA_SETS = {
+    "EU": {
+        "file": os.path.join(PATH_FIXTURES, "eu.xml"),
+        "loader": inoutlists.LoaderEUXML,
+        "description": "EU Sanctions list"
+    },
+    "OFAC": {
+        "file": os.path.join(PATH_FIXTURES, "sdn.xml"),
+        "loader": inoutlists.LoaderOFACXML,
+        "description": "OFAC SDN list"
+    }
+}
+
+def comparable(df):
+
+    # Entries in (source, id) order, rows of an entry in their own order
+
+    df = df.reindex(columns=LIST_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    df = df.sort_values(["source", "id"], kind="stable")
+
+    return df.reset_index(drop=True)
+
+def loaded_frame():
+
+    # Same loading as the non streaming path of data_preparation.py
+
+    lsData = []
+    for source, dataSetInfo in DATA_SETS.items():
+        dfDataSet = inoutlists.dump(
+            inoutlists.load(
+                dataSetInfo["file"],
+                dataSetInfo["loader"],
+                description=dataSetInfo["description"]
+            ),
+            inoutlists.DumperPandas
+        )
+        dfDataSet["source"] = source
+        lsData.append(dfDataSet)
+
+    return pd.concat(lsData, ignore_index=True)
+
+def streamed_frame(tmpPath):
+
+    file = tmpPath / "raw.parquet"
+    numRows = write_lists_parquet(DATA_SETS, str(file), batchSize=2)
+    dfStreamed = pd.read_parquet(file, engine="fastparquet")
+
+    assert numRows == len(dfStreamed)
+
+    return dfStreamed
+
+def test_streaming_matches_inoutlists(tmp_path):
+
+    dfLoaded = loaded_frame()
+    dfStreamed = streamed_frame(tmp_path)
+
+    assert len(dfStreamed) == len(dfLoaded)
+    assert dfStreamed.columns.tolist() == LIST_COLUMNS
+    assert dfStreamed.names_strong.dtype == "boolean"
+    pd.testing.assert_frame_equal(comparable(dfStreamed), comparable(dfLoaded))
+
+def sorted_hashes(dfHashes):
+
+    return dfHashes.sort_values(["source", "id"]).reset_index(drop=True)
+
+def test_entry_hashes_do_not_depend_on_the_loading(tmp_path):
+
+    # The streamed frame has all LIST_COLUMNS (and the prepared one IDX)
+
+    dfLoaded = loaded_frame()
+    dfLoaded["IDX"] = dfLoaded["id"] + "-" + dfLoaded.index.astype(str)
+
+    pd.testing.assert_frame_equal(
+        sorted_hashes(list_entry_hashes(streamed_frame(tmp_path))),
+        sorted_hashes(list_entry_hashes(dfLoaded))
+    )
+
+def test_entry_hashes_change_with_the_entry_only():
+
+    dfLoaded = loaded_frame()
+    dfHashes = sorted_hashes(list_entry_hashes(dfLoaded))
+
+    dfChanged = dfLoaded.copy()
+    dfChanged.loc[dfChanged.id == "36", "addresses_city"] = "HAVANA VIEJA"
+    dfChangedHashes = sorted_hashes(list_entry_hashes(dfChanged))
+
+    assert (dfChangedHashes.hash != dfHashes.hash).tolist() == (
+        dfHashes.id == "36"
+    ).tolist()
+
+    ## Rows of an entry in another order, or a value in another column
+
+    dfSwapped = pd.concat(
+        [dfLoaded[dfLoaded.id != "173"], dfLoaded[dfLoaded.id == "173"][::-1]],
+        ignore_index=True
+    )
+    dfSwappedHashes = sorted_hashes(list_entry_hashes(dfSwapped))
+
+    assert (dfSwappedHashes.hash != dfHashes.hash).tolist() == (
+        dfHashes.id == "173"
+    ).tolist()
+
+    dfMoved = dfLoaded.copy()
+    maskMoved = dfMoved.id == "306"
+    dfMoved.loc[maskMoved, "names_first_name"] = dfMoved.loc[maskMoved, "names_whole_name"]
+    dfMoved.loc[maskMoved, "names_whole_name"] = None
+
+    assert (
+        sorted_hashes(list_entry_hashes(dfMoved)).hash != dfHashes.hash
+    ).tolist() == (dfHashes.id == "306").tolist()
+
+def test_documents_load_with_the_public_api():
+
+    # Batches of 2 entries, each a valid list with the OFAC publishing
+    # information
+
+    documents = list(iter_list_documents(DATA_SETS["OFAC"]["file"], inoutlists.LoaderOFACXML, 2))
+    lsData = [inoutlists.load(document, inoutlists.LoaderOFACXML) for document in documents]
+
+    assert len(documents) == 2
+    assert [data["meta"]["list_date"] for data in lsData] == ["2025-12-19", "2025-12-19"]
+    assert [
+        [entry["id"] for entry in data["list_entries"]] for data in lsData
+    ] == [["36", "173"], ["306"]]
+
+def test_unknown_inoutlists_columns_raise(monkeypatch):
+
+    monkeypatch.setattr(
+        list_streaming,
+        "LIST_COLUMNS",
+        [column for column in LIST_COLUMNS if column != "programs"]
+    )
+
+    with pytest.raises(ValueError, match="programs"):
+        next(list_streaming.iter_list_batches(
+            DATA_SETS["EU"]["file"],
+            inoutlists.LoaderEUXML,
+            "EU"
+        ))
+
+def test_invalid_list_raises(tmp_path):
+
+    fileInvalid = tmp_path / "sdn.xml"
+    with open(DATA_SETS["OFAC"]["file"], encoding="utf-8") as f:
+        xml = f.read()
+    with open(fileInvalid, "w", encoding="utf-8") as f:
+        f.write(xml.replace("<uid>306</uid>", "<uid>not an int</uid>"))
+
+    with pytest.raises(ValueError, match="Data invalid"):
+        list(iter_list_documents(str(fileInvalid), inoutlists.LoaderOFACXML))
+
+def test_invalid_list_leaves_no_output(tmp_path):
+
+    fileInvalid = tmp_path / "eu.xml"
+    with open(DATA_SETS["EU"]["file"], encoding="utf-8") as f:
+        xml = f.read()
+    with open(fileInvalid, "w", encoding="utf-8") as f:
+        f.write(xml.replace('classificationCode="E"', 'classificationCode="X"'))
+
+    file = tmp_path / "raw.parquet"
+    dataSets = {
+        "OFAC": DATA_SETS["OFAC"],
+        "EU": dict(DATA_SETS["EU"], file=str(fileInvalid))
+    }
+
+    with pytest.raises(ValueError, match="Data invalid"):
+        write_lists_parquet(dataSets, str(file), batchSize=1)
+
+    assert os.listdir(tmp_path) == ["eu.xml"]
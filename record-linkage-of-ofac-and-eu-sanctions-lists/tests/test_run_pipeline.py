@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import subprocess
+
+PATH_PROJECT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Stand-in for data_preparation.py: logs its flags and writes its outputs
+
+DATA_PREPARATION = """import sys
+
+with open("../data/runs.txt", "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+for output in ["../data/data_EU_OFAC.parquet", "../data/data_EU_OFAC_hashes.parquet"]:
+    with open(output, "w") as f:
+        f.write("prepared")
+"""
+
+def project(tmpPath):
+
+    # Copy of the runner with the data_preparation stage files
+
+    os.makedirs(tmpPath / "pipeline")
+    shutil.copy(
+        os.path.join(PATH_PROJECT, "pipeline", "run_pipeline.py"),
+        tmpPath / "pipeline" / "run_pipeline.py"
+    )
+    for folder, file, content in [
+        ("data-preparation", "data_preparation.py", DATA_PREPARATION),
+        ("data", "20251219-FULL-1_1(xsd).xml", "<export/>"),
+        ("data", "sdn.xml", "<sdnList/>"),
+        ("support", "addresses_city_normalization.csv", "city\n")
+    ]:
+        os.makedirs(tmpPath / folder, exist_ok=True)
+        with open(tmpPath / folder / file, "w") as f:
+            f.write(content)
+
+    return tmpPath
+
+def run(tmpPath, *flags):
+
+    result = subprocess.run(
+        [sys.executable, str(tmpPath / "pipeline" / "run_pipeline.py"), "data_preparation", *flags],
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    return result.stdout
+
+def runs(tmpPath):
+
+    with open(tmpPath / "data" / "runs.txt") as f:
+        return f.read().splitlines()
+
+def test_stage_skipped_until_inputs_options_or_outputs_change(tmp_path):
+
+    tmpPath = project(tmp_path)
+
+    assert "running (no previous run)" in run(tmpPath)
+    assert "up to date" in run(tmpPath)
+    assert runs(tmpPath) == ["--workers 1"]
+
+    ## Options are forwarded and part of the stamp
+
+    assert "params: --streaming" in run(tmpPath, "--streaming", "--city-fuzzy")
+    assert "up to date" in run(tmpPath, "--streaming", "--city-fuzzy")
+    assert "params: --delta" in run(tmpPath, "--streaming", "--city-fuzzy", "--delta")
+    assert runs(tmpPath)[1:] == [
+        "--workers 1 --streaming --city-fuzzy",
+        "--workers 1 --delta --streaming --city-fuzzy"
+    ]
+
+    ## Changed input, missing output
+
+    with open(tmpPath / "data" / "sdn.xml", "w") as f:
+        f.write("<sdnList></sdnList>")
+    assert "inputs: data/sdn.xml" in run(tmpPath)
+
+    os.remove(tmpPath / "data" / "data_EU_OFAC_hashes.parquet")
+    assert "missing outputs" in run(tmpPath)
+    assert len(runs(tmpPath)) == 5
+
+    ## A dry run only reports
+
+    assert "out of date (params: --delta)" in run(tmpPath, "--delta", "--dry-run")
+    assert len(runs(tmpPath)) == 5
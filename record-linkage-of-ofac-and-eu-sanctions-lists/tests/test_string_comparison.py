@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from support.string_comparison import COMPARE_COLUMNS, compare_pairs
+
+recordlinkage = pytest.importorskip("recordlinkage")
+
+def recordlinkage_scores(pairs, namesLeft, namesRight):
+
+    compare = recordlinkage.Compare()
+    compare.string("n", "n", method="jarowinkler")
+    compare.string("n", "n", method="cosine")
+
+    return compare.compute(
+        pairs,
+        namesLeft.to_frame("n"),
+        namesRight.to_frame("n")
+    ).set_axis(COMPARE_COLUMNS, axis=1)
+
+def test_missing_and_empty_names_score_as_recordlinkage():
+
+    namesLeft = pd.Series(["ivan petrov", None, " ", "-", "ivan", "ali hassan"])
+    namesRight = pd.Series(["ivan petrof", "ivan", " ", "-", None, "ali hasan"])
+    pairs = pd.MultiIndex.from_arrays([range(6), range(6)])
+
+    dfScores = compare_pairs(pairs, namesLeft, namesRight)
+
+    assert not dfScores.isna().any().any()
+    pd.testing.assert_frame_equal(
+        dfScores,
+        recordlinkage_scores(pairs, namesLeft, namesRight),
+        check_names=False
+    )
+
+def test_random_names_score_as_recordlinkage():
+
+    rng = np.random.default_rng(0)
+    words = ["ivan", "petrov", "ali", "hassan", "bank", "trade", "müller", "o'neil"]
+    names = [
+        " ".join(rng.choice(words, rng.integers(1, 4)))
+        for _ in range(300)
+    ]
+    namesLeft = pd.Series(names[:150], index=np.arange(150) * 2)
+    namesRight = pd.Series(names[150:], index=np.arange(150) * 3)
+    pairs = pd.MultiIndex.from_arrays([
+        rng.choice(namesLeft.index, 2000),
+        rng.choice(namesRight.index, 2000)
+    ])
+
+    pd.testing.assert_frame_equal(
+        compare_pairs(pairs, namesLeft, namesRight),
+        recordlinkage_scores(pairs, namesLeft, namesRight),
+        check_names=False
+    )
+
+def test_pruned_pairs_stay_under_the_lowest_threshold():
+
+    from jellyfish import jaro_winkler_similarity
+    from support.string_comparison import JW_PRUNED_VALUE, NameComparator
+
+    rng = np.random.default_rng(1)
+    syllables = ["al", "ex", "an", "der", "iv", "ov", "pet", "rov", "ma", "ria", "co", "ltd", " "]
+    names = list({
+        "".join(rng.choice(syllables, rng.integers(1, 8))).strip()
+        for _ in range(400)
+    } | {"", "éa", "ea", "a  b", "a b"})
+    thresholds = [0.70, 0.75, 0.80, 0.85, 0.90, 0.95, 1.00]
+
+    comparator = NameComparator(pd.Series(names), minScore=min(thresholds))
+    codesLeft = np.repeat(np.arange(len(names)), len(names))
+    codesRight = np.tile(np.arange(len(names)), len(names))
+    scores = comparator.compare(codesLeft, codesRight)
+
+    exact = np.array([
+        jaro_winkler_similarity(left, right)
+        for left, right in zip(comparator.values[codesLeft], comparator.values[codesRight])
+    ])
+    pruned = scores["distance_jw"] != exact
+
+    assert comparator.counters["pruned_length"] + comparator.counters["pruned_characters"] > 0
+    assert (exact[pruned] < min(thresholds)).all()
+    assert (scores["distance_jw"][pruned] == JW_PRUNED_VALUE).all()
+
+    distanceMax = np.maximum(scores["distance_jw"], scores["distance_cosine"])
+    distanceMaxExact = np.maximum(exact, scores["distance_cosine"])
+    for threshold in thresholds:
+        assert ((distanceMax >= threshold) == (distanceMaxExact >= threshold)).all()
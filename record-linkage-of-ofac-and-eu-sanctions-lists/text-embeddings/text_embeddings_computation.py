@@ -21,6 +21,8 @@ import pandas as pd
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from support.utils import timer
+from support.data_schema import read_data
+from support.fingerprints import fingerprint, dedup_by_fingerprint
 
 ###############################
 #         Parameters          #
@@ -31,6 +33,7 @@ FILE_RESULTS = os.path.join(PATH_DATA, "data_text_embeddings.parquet")
 FILE_PROCESS_MEASURES = os.path.join(PATH_SRC, "text_embeddings_computation_process_measures.xlsx")
 
 RELEVANT_COLS = [
+    "record_id",
     "source",
     "id",
     "IDX",
@@ -58,9 +61,10 @@ MODELS = {
 
 with timer("Data retrieval", processMeasures):    
 
-    dfData = pd.read_parquet(
+    dfData = read_data(
         FILE_DATA,
-        engine= "fastparquet"
+        columns = RELEVANT_COLS + ["names_strong"],
+        filters = [("type", "in", ["I", "O"])]
     )
 
 # Data preparation
@@ -72,24 +76,18 @@ with timer("Data preparation", processMeasures):
         (dfData.names_strong)
     ].copy()
 
-    dfDataEmb.sort_values(
-        by=[
-            "source", 
-            "id", 
-            "names_whole_name_norm_basic"
-        ],
-        inplace=True
-    )
+    ## First row of each name, by 64-bit fingerprint of source, id and
+    ## normalized name (rows stay in record order)
 
-    dfDataEmb.drop_duplicates(
-        subset=[
-            "source", 
-            "id", 
+    dfDataEmb["name_fingerprint"] = fingerprint(
+        dfDataEmb,
+        [
+            "source",
+            "id",
             "names_whole_name_norm_basic"
-        ],
-        keep="first",
-        inplace=True
+        ]
     )
+    dfDataEmb = dedup_by_fingerprint(dfDataEmb, "name_fingerprint")
 
     dfDataEmb = dfDataEmb[RELEVANT_COLS]   
 
@@ -21,6 +21,7 @@ import pandas as pd
 import numpy as np
 import faiss
 from support.utils import timer, confusion_matrix
+from support.ground_truth import GroundTruth
 
 ###############################
 #         Parameters          #
@@ -221,10 +222,7 @@ def getSimilaritiesByRange(dfEmb, entityType, minThreshold):
 
 with timer("Data retrieval", processMeasures):
 
-    dfOS = pd.read_parquet(
-        FILE_OS,
-        engine = "fastparquet"
-    )
+    groundTruth = GroundTruth.load(FILE_OS)
 
     dfEmb = pd.read_parquet(
         FILE_EMB,
@@ -274,28 +272,11 @@ with timer("Get similarities", processMeasures):
 
 with timer("Real match retrieval", processMeasures):
 
-    ## Remove OS eu and ofac ids not in dataset
-
-    dfOSInData = dfOS.copy()
-
-    maskOsInDataEU = (
-        (~dfOSInData.id_ori_eu.isin(dfEmb[dfEmb.source == "EU"].id.unique())) &
-        (dfOSInData.source.isin(["EU", "EU & OFAC"]))
-    )
-    dfOSInData = dfOSInData[~maskOsInDataEU].copy()
-
-    maskOsInDataOFAC = (
-        (~dfOSInData.id_ori_ofac.isin(dfEmb[dfEmb.source == "OFAC"].id.unique())) &
-        (dfOSInData.source.isin(["OFAC", "EU & OFAC"]))
-    )
-    dfOSInData = dfOSInData[~maskOsInDataOFAC].copy()
+    ## OS matches whose eu and ofac ids are both in dataset
 
-    dfOSInData.rename(
-        columns={
-            "id_ori_eu": "id_EU",
-            "id_ori_ofac": "id_OFAC"
-        },
-        inplace=True
+    groundTruth = groundTruth.restrict(
+        dfEmb[dfEmb.source == "EU"].id.unique(),
+        dfEmb[dfEmb.source == "OFAC"].id.unique()
     )
 
     ## Retrieve real matches
@@ -318,32 +299,27 @@ with timer("Real match retrieval", processMeasures):
         inplace=True
     )
 
-    dfAssestment = dfAssestment.merge(
-        dfOSInData[dfOSInData.source == "EU & OFAC"][
-            [         
-                "id_EU",           
-                "id_OFAC",
-            ]
-        ],
-        on = ["id_EU", "id_OFAC"],
-        how ="outer",
-        indicator = True
-    )  
-
-    dfAssestment["real"] = np.where(
-        dfAssestment._merge.isin(["both", "right_only"]),
-        True,
-        False
+    dfAssestment["real"] = groundTruth.contains(
+        dfAssestment["id_EU"],
+        dfAssestment["id_OFAC"]
     )
+    dfAssestment["in_minThreshold"] = True
 
-    dfAssestment["in_minThreshold"] = np.where(
-        dfAssestment._merge.isin(["both", "left_only"]),
-        True,
-        False
+    ## Real matches not in min threshold
+
+    dfNotInMinThreshold = groundTruth.missing(
+        dfAssestment["id_EU"],
+        dfAssestment["id_OFAC"]
     )
-        
-    dfAssestment = dfAssestment.drop(
-        columns = ["_merge", "type"]
+    dfNotInMinThreshold["real"] = True
+    dfNotInMinThreshold["in_minThreshold"] = False
+
+    dfAssestment = pd.concat(
+        [
+            dfAssestment.drop(columns = ["type"]),
+            dfNotInMinThreshold
+        ],
+        ignore_index = True
     )
 
     ## Retrieve type for all records
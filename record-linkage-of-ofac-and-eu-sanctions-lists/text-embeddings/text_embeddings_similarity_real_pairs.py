@@ -20,6 +20,7 @@ if PATH_PROJECT not in sys.path:
 import os
 import pandas as pd
 import numpy as np
+from support.ground_truth import GroundTruth
 
 ###############################
 #         Parameters          #
@@ -40,10 +41,7 @@ FILE_RESULTS_DATA = os.path.join(PATH_DATA, "text_embeddings_similarity_real_pai
 
 # Data Retrieval
 
-dfOS = pd.read_parquet(
-    FILE_OS,
-    engine = "fastparquet"
-)
+groundTruth = GroundTruth.load(FILE_OS)
 
 dfEmb = pd.read_parquet(
     FILE_EMB,
@@ -54,30 +52,19 @@ dfEmb = pd.read_parquet(
 
 ## Keep only OS ids in data
 
-dfOSInData = dfOS.copy()
-
-maskOsInDataEU = (
-    (~dfOSInData.id_ori_eu.isin(dfEmb[dfEmb.source == "EU"].id.unique())) &
-    (dfOSInData.source.isin(["EU", "EU & OFAC"]))
-)
-dfOSInData = dfOSInData[~maskOsInDataEU].copy()
-
-maskOsInDataOFAC = (
-    (~dfOSInData.id_ori_ofac.isin(dfEmb[dfEmb.source == "OFAC"].id.unique())) &
-    (dfOSInData.source.isin(["OFAC", "EU & OFAC"]))
+groundTruth = groundTruth.restrict(
+    dfEmb[dfEmb.source == "EU"].id.unique(),
+    dfEmb[dfEmb.source == "OFAC"].id.unique()
 )
-dfOSInData = dfOSInData[~maskOsInDataOFAC].copy()
 
 ## Get real pairs
 
-dfOSReal = dfOSInData[
-    dfOSInData.source == "EU & OFAC"
-][
-    [
-        "id_ori_eu",
-        "id_ori_ofac"
-    ]
-].copy()
+dfOSReal = groundTruth.pairs().rename(
+    columns={
+        "id_EU": "id_ori_eu",
+        "id_OFAC": "id_ori_ofac"
+    }
+)
 
 # Get real pairs similarities
 
@@ -122,8 +109,8 @@ dfOSRealIds.sort_values(
         "id_ori_eu",
         "id_ori_ofac",
         "similarity",
-        "IDX_EU",
-        "IDX_OFAC"
+        "record_id_EU",
+        "record_id_OFAC"
     ],
     ascending=[
         True,